@@ -0,0 +1,131 @@
+"""Benchmark catalog ingestion: whole-file preprocessing vs chunked, parallel ingestion.
+
+Each configuration runs cold (empty cache) in a fresh interpreter. The report has
+the wall time and peak resident memory of the main process and of its pool workers.
+Embeddings come from the stub encoder, so encoding cost is small and the
+preprocessing cost dominates.
+
+    python -m benchmarks.bench_ingest --rows 100000 --jobs 1 2 4 8
+    python -m benchmarks.bench_ingest --data-path data/sephora_products.csv --chunk-rows 20000
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_WORK_DIR = REPO_DIR / 'cache' / 'bench'
+
+
+def _peak_rss_mb(children: bool = False) -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return round(usage.ru_maxrss / 1024, 1)  # kilobytes on Linux
+
+
+def ingest(data_path: str, cache_dir: str, jobs: int, chunk_rows: int, batch_rows: int) -> Dict:
+    """Child process: one cold ingestion, 'whole' style when jobs is 0"""
+    from benchmarks import stub_encoder
+    import pandas as pd
+    from utils.catalog_ingest import ingest_catalog
+    from utils.catalog_preprocessor import preprocess_catalog, product_texts
+    from utils.embedding_store import EmbeddingStore
+    from utils.ingredient_analyzer import IngredientAnalyzer
+    from utils.text_column import TextColumn, TextColumnWriter
+
+    encoder = stub_encoder.StubSentenceTransformer()
+    analyzer = IngredientAnalyzer()
+    store = EmbeddingStore(cache_dir, 'benchmark-stub-hashing-384')
+    start = time.perf_counter()
+    if jobs == 0:
+        # What startup did before chunked ingestion: the whole CSV in one frame, then one encode
+        df = preprocess_catalog(pd.read_csv(data_path), analyzer)
+        embeddings = store.get_or_compute(product_texts(df), encoder.encode)
+        descriptions = TextColumn.from_strings(df['description'])
+    else:
+        writer = TextColumnWriter(str(Path(cache_dir) / 'descriptions'))
+        frames = []
+
+        def chunk_texts():
+            for chunk, texts in ingest_catalog(data_path, analyzer, writer, jobs, chunk_rows):
+                frames.append(chunk)
+                yield texts
+
+        embeddings = store.get_or_compute_chunks(chunk_texts(), encoder.encode, batch_rows)
+        df = pd.concat(frames, ignore_index=True)
+        del frames
+        descriptions = writer.close()
+    return {
+        'rows': len(df),
+        'wall_s': round(time.perf_counter() - start, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+        'worker_peak_rss_mb': _peak_rss_mb(children=True),
+        'frame_mb': round(df.memory_usage(deep=True).sum() / 2**20, 1),
+        'embeddings_shape': list(embeddings.shape),
+        'descriptions_mb': round(descriptions.nbytes / 2**20, 1),
+    }
+
+
+def run(args, jobs: int) -> Dict:
+    cache_dir = Path(args.work_dir) / 'ingest-cache'
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    command = [
+        sys.executable, '-m', 'benchmarks.bench_ingest', '--data-path', args.data_path,
+        '--chunk-rows', str(args.chunk_rows), '--batch-rows', str(args.batch_rows),
+        '--child', str(jobs), str(cache_dir)
+    ]
+    output = subprocess.run(command, cwd=REPO_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-path', help="catalog CSV; a synthetic one of --rows rows by default")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunk-rows', type=int, default=20000)
+    parser.add_argument('--batch-rows', type=int, default=4096)
+    parser.add_argument('--skip-whole', action='store_true', help="leave out the whole-file baseline")
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR))
+    parser.add_argument('--out', help="also write the results as JSON")
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        jobs, cache_dir = int(args.child[0]), args.child[1]
+        print(json.dumps(ingest(args.data_path, cache_dir, jobs, args.chunk_rows, args.batch_rows)))
+        return
+
+    if not args.data_path:
+        from benchmarks.synthetic_catalog import write_catalog
+        args.data_path = str(write_catalog(
+            str(Path(args.work_dir) / 'data' / f'catalog-{args.rows}.csv'), args.rows
+        ))
+
+    results = {}
+    for jobs in ([] if args.skip_whole else [0]) + args.jobs:
+        label = 'whole file' if jobs == 0 else f'chunked, {jobs} worker{"s" if jobs > 1 else ""}'
+        results[label] = result = run(args, jobs)
+        memory = '' if result['peak_rss_mb'] is None else (
+            f"  peak RSS {result['peak_rss_mb']:8.1f} MB (workers {result['worker_peak_rss_mb']:.1f} MB)"
+        )
+        print(f"{label:22} {result['wall_s']:8.2f}s{memory}  frame {result['frame_mb']:.1f} MB")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
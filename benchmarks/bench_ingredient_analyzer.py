@@ -0,0 +1,81 @@
+"""Benchmark IngredientAnalyzer: legacy nested scan vs per-row automaton vs analyze_many.
+
+    python -m benchmarks.bench_ingredient_analyzer --rows 100000
+"""
+import argparse
+import random
+import time
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models.pydantic_models import IngredientAnalysis
+from utils.ingredient_analyzer import IngredientAnalyzer
+
+COMMON_INGREDIENTS = [
+    'water', 'aqua', 'glycerin', 'butylene glycol', 'dimethicone', 'niacinamide',
+    'phenoxyethanol', 'sodium hyaluronate', 'caprylic/capric triglyceride', 'cetearyl alcohol',
+    'tocopherol', 'fragrance', 'citric acid', 'xanthan gum', 'ethylhexylglycerin', 'carbomer',
+    'panthenol', 'allantoin', 'squalane', 'methylparaben', 'sodium lauryl sulfate',
+    'hyaluronic acid', 'salicylic acid', 'aloe vera leaf juice', 'green tea extract', 'lanolin',
+]
+
+
+def legacy_analyze(analyzer: IngredientAnalyzer, ingredients_str):
+    """The original nested any(term in ingredient) scan, kept as the baseline"""
+    if not isinstance(ingredients_str, str) or not ingredients_str.strip():
+        return IngredientAnalysis(ingredients_list=[], potentially_harmful=[], key_benefits=[], common_allergens=[])
+    ingredients_list = [i.strip().lower() for i in ingredients_str.split(',')]
+    harmful = []
+    for category, ingredients in analyzer.potentially_harmful.items():
+        harmful.extend(i for i in ingredients if any(i in ing for ing in ingredients_list))
+    allergens = [a for a in analyzer.common_allergens if any(a in ing for ing in ingredients_list)]
+    benefits = []
+    for benefit, ingredients in analyzer.beneficial_ingredients.items():
+        found = [i for i in ingredients if any(i in ing for ing in ingredients_list)]
+        if found:
+            benefits.append(f"{benefit.title()}: {', '.join(found)}")
+    return IngredientAnalysis(
+        ingredients_list=ingredients_list,
+        potentially_harmful=harmful,
+        key_benefits=benefits,
+        common_allergens=allergens
+    )
+
+
+def synthetic_ingredients(n_rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = COMMON_INGREDIENTS + [f'botanical {i} leaf extract' for i in range(500)]
+    return [', '.join(rng.sample(vocabulary, rng.randint(15, 45))).title() for _ in range(n_rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    analyzer = IngredientAnalyzer()
+    values = synthetic_ingredients(args.rows)
+
+    start = time.perf_counter()
+    expected = [legacy_analyze(analyzer, v) for v in values]
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_row = [analyzer.analyze_ingredients(v) for v in values]
+    automaton = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = analyzer.analyze_many(values)
+    batched = time.perf_counter() - start
+
+    identical = per_row == expected and batch == expected
+
+    print(f"rows: {args.rows}  identical output: {identical}")
+    print(f"legacy scan:      {legacy:8.3f}s")
+    print(f"analyze (per row):{automaton:8.3f}s  {legacy / automaton:5.1f}x")
+    print(f"analyze_many:     {batched:8.3f}s  {legacy / batched:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark quantized embedding scoring against the float32 index.
+
+Reports memory, per-query latency and recall@k of float16 / int8 scoring with
+full-precision rescoring; exits non-zero if recall falls below --min-recall.
+
+    python -m benchmarks.bench_quantized_embeddings --rows 200000 --dim 384
+"""
+import argparse
+import time
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from utils.quantized_embeddings import QuantizedEmbeddings
+from utils.vector_index import BruteForceIndex, VectorIndex, recall_at_k
+
+
+def synthetic_embeddings(n_rows: int, dim: int, n_clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around cluster centres, like product embeddings of a category tree"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, n_clusters, n_rows)]
+    vectors += 0.6 * rng.standard_normal((n_rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def mean_latency_ms(index: VectorIndex, queries: np.ndarray, k: int) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def batch_latency_ms(index: VectorIndex, queries: np.ndarray, k: int) -> float:
+    """Per-query cost when scoring all queries in one pass, as recommend_batch does"""
+    start = time.perf_counter()
+    scores = index.score_all(queries)
+    rows = np.arange(len(index))
+    for query, row_scores in zip(queries, scores):
+        index.select(query, rows, row_scores, k)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--rescore-factor', type=int, default=4)
+    parser.add_argument('--min-recall', type=float, default=0.99)
+    args = parser.parse_args()
+
+    embeddings = synthetic_embeddings(args.rows, args.dim)
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.integers(0, args.rows, args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    # Every other query runs under a filter that keeps ~10% of the catalog
+    masks = [rng.random(args.rows) < 0.1 if i % 2 else None for i in range(args.queries)]
+
+    reference = BruteForceIndex(embeddings)
+    baseline = mean_latency_ms(reference, queries, args.k)
+    batch_baseline = batch_latency_ms(reference, queries, args.k)
+    print(f"rows: {args.rows}  dim: {args.dim}  k: {args.k}  rescore factor: {args.rescore_factor}")
+    print(f"{'precision':10} {'memory MB':>10} {'ms/query':>9} {'speedup':>8} "
+          f"{'batch ms/q':>11} {'speedup':>8} {'recall@k':>9} {'top-1':>6}")
+    print(f"{'float32':10} {embeddings.nbytes / 2**20:10.1f} {baseline:9.2f} {1.0:7.1f}x "
+          f"{batch_baseline:11.3f} {1.0:7.1f}x {1.0:9.4f} {1.0:6.3f}")
+
+    failed = False
+    for precision in ('float16', 'int8'):
+        quantized = QuantizedEmbeddings(embeddings, precision)
+        index = BruteForceIndex(embeddings, quantized=quantized, rescore_factor=args.rescore_factor)
+        latency = mean_latency_ms(index, queries, args.k)
+        batch_latency = batch_latency_ms(index, queries, args.k)
+        recall = recall_at_k(index, reference, queries, args.k, masks)
+        top1 = np.mean([
+            index.search(q, 1, m)[0][:1].tolist() == reference.search(q, 1, m)[0][:1].tolist()
+            for q, m in zip(queries, masks)
+        ])
+        print(f"{precision:10} {quantized.nbytes / 2**20:10.1f} {latency:9.2f} {baseline / latency:7.1f}x "
+              f"{batch_latency:11.3f} {batch_baseline / batch_latency:7.1f}x {recall:9.4f} {top1:6.3f}")
+        failed |= recall < args.min_recall
+
+    if failed:
+        print(f"FAIL: recall@{args.k} below {args.min_recall}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
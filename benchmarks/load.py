@@ -0,0 +1,47 @@
+"""Closed-loop HTTP load generator, run in its own process so it does not share the server's GIL"""
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _post(url: str, body: bytes) -> Tuple[int, float]:
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_load(url: str, payloads: List[Dict], concurrency: int, n_requests: int) -> Dict[str, float]:
+    """Send n_requests POSTs with `concurrency` in flight; payloads are cycled"""
+    bodies = [json.dumps(p).encode('utf-8') for p in payloads]
+    with ThreadPoolExecutor(concurrency) as pool:
+        # Warm up connections and caches outside the measurement
+        list(pool.map(lambda i: _post(url, bodies[i % len(bodies)]), range(concurrency)))
+        start = time.perf_counter()
+        results = list(pool.map(lambda i: _post(url, bodies[i % len(bodies)]), range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    statuses = np.array([status for status, _ in results])
+    latencies = np.array([latency for status, latency in results if status == 200]) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': n_requests,
+        'throughput_per_s': float((statuses == 200).sum() / elapsed),
+        'ok': int((statuses == 200).sum()),
+        'rejected_503': int((statuses == 503).sum()),
+        'errors': int(((statuses != 200) & (statuses != 503)).sum()),
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+    }
@@ -0,0 +1,326 @@
+"""Performance benchmark suite on synthetic catalogs with an offline stub encoder.
+
+Measures, per catalog size: ProductRecommender startup stages (cold and warm
+cache), find_similar_products under filter/exclusion mixes, ChatHandler.handle_chat
+end to end (first turns and follow-ups), time to first token of streamed
+answers with and without prompt-prefix reuse, and /chat throughput at several
+concurrency levels. Results are written as JSON and can be compared against an
+earlier run.
+
+    python -m benchmarks.run_benchmarks --rows 1000 10000 --out bench.json
+    python -m benchmarks.run_benchmarks --rows 10000 --baseline bench.json --out new.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+import numpy as np
+from benchmarks import stub_encoder
+from benchmarks.load import run_load
+from benchmarks.synthetic_catalog import write_catalog
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_WORK_DIR = REPO_DIR / 'cache' / 'bench'
+
+QUERIES = [
+    'hydrating moisturizer for dry skin', 'gentle cleanser', 'serum for dark spots and dullness',
+    'oil free gel moisturizer for oily skin', 'retinol night cream for fine lines', 'calming toner',
+    'clay mask for pores', 'eye cream for puffiness', 'mineral sunscreen', 'barrier repair balm',
+    'vitamin c brightening serum', 'acne spot treatment with salicylic acid', 'lightweight lotion',
+    'rich overnight mask', 'niacinamide serum for redness', 'exfoliating toner with glycolic acid',
+]
+
+# name -> (filters, excluded ingredients)
+SEARCH_MIXES = {
+    'no_filters': ({}, []),
+    'price': ({'price_range': [0, 50]}, []),
+    'skin_type': ({'skin_type': 'dry'}, []),
+    'brand': ({'brand': 'tatcha'}, []),
+    'exclusions': ({}, ['fragrance', 'parabens']),
+    'combined': ({'price_range': [0, 60], 'skin_type': 'sensitive'}, ['fragrance', 'alcohol']),
+}
+
+# Absolute changes below these are timer noise, never regressions
+NOISE_FLOOR = {'_ms': 0.05, '_s': 0.005, '_per_s': 0.5, '_mb': 5.0}
+
+CHAT_MESSAGES = [
+    'I need a moisturizer for dry skin under $50',
+    'Show me a gentle cleanser without fragrance',
+    'Something for dark spots, avoid parabens',
+    'Compare P100000 and P100001',
+    'Any dupes for P100002?',
+]
+
+
+# Simulated prompt evaluation cost of the stub generator in bench_stream
+STREAM_PREFILL_MS_PER_KCHAR = 20.0
+
+
+def _summary(seconds: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+    }
+
+
+def _time_calls(fn: Callable, calls: Sequence[tuple], repeat: int) -> Dict[str, float]:
+    """Latency summary of fn over calls, after one untimed warm-up pass"""
+    for args in calls:
+        fn(*args)
+    seconds = []
+    for _ in range(repeat):
+        for args in calls:
+            start = time.perf_counter()
+            fn(*args)
+            seconds.append(time.perf_counter() - start)
+    return _summary(seconds)
+
+
+def build_recommender(data_path: str):
+    """ProductRecommender plus the wall time of each startup phase"""
+    from utils.product_recommender import ProductRecommender
+
+    start = time.perf_counter()
+    recommender = ProductRecommender(data_path)
+    timings = {f'{phase}_s': seconds for phase, seconds in recommender.startup_timings.items()}
+    timings['total_s'] = time.perf_counter() - start
+    return recommender, timings
+
+
+def bench_search(recommender, repeat: int) -> Dict[str, Dict[str, float]]:
+    return {
+        mix: _time_calls(
+            recommender.find_similar_products,
+            [(query, filters, excluded) for query in QUERIES],
+            repeat
+        )
+        for mix, (filters, excluded) in SEARCH_MIXES.items()
+    }
+
+
+def bench_chat(recommender, repeat: int) -> Dict[str, float]:
+    from models.pydantic_models import ChatRequest
+    from utils.chat_handler import ChatHandler
+
+    handler = ChatHandler(recommender)
+    requests = [
+        (ChatRequest(messages=[{'role': 'user', 'content': message}]),) for message in CHAT_MESSAGES
+    ]
+    return _time_calls(handler.handle_chat, requests, repeat)
+
+
+def bench_followups(recommender, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Follow-up turns that reuse a conversation's cached ranking instead of searching again"""
+    from models.pydantic_models import ChatRequest
+    from utils.chat_handler import ChatHandler
+
+    handler = ChatHandler(recommender)
+    message = lambda text, **kwargs: ChatRequest(messages=[{'role': 'user', 'content': text}], **kwargs)
+    conversations = [handler.handle_chat(message(query)).conversation_id for query in QUERIES]
+    return {
+        followup: _time_calls(
+            handler.handle_chat,
+            [(message(followup, conversation_id=conversation),) for conversation in conversations],
+            repeat
+        )
+        for followup in ('show me more', 'cheaper ones')
+    }
+
+
+def bench_stream(recommender, repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Time to first token and to the end of /chat/stream answers, with and without the prompt-prefix cache.
+
+    The stub generator simulates prefill at STREAM_PREFILL_MS_PER_KCHAR (scaled well
+    down from a CPU-hosted 7B model), so the gap shows what prefix reuse saves.
+    """
+    from models.pydantic_models import ChatRequest
+    from utils.answer_generator import StubGenerator
+    from utils.chat_handler import ChatHandler
+
+    requests = [ChatRequest(messages=[{'role': 'user', 'content': query}]) for query in QUERIES]
+    results = {}
+    for label, cache_size in (('prefix_cached', 4), ('no_prefix_cache', 0)):
+        handler = ChatHandler(recommender, generator=StubGenerator(
+            cache_size, prefill_ms_per_kchar=STREAM_PREFILL_MS_PER_KCHAR
+        ))
+        ttft, total = [], []
+        for timed in [False] + [True] * repeat:
+            for request in requests:
+                start = time.perf_counter()
+                first = None
+                for name, _ in handler.stream_chat(request):
+                    if name == 'token' and first is None:
+                        first = time.perf_counter() - start
+                if timed:
+                    ttft.append(first)
+                    total.append(time.perf_counter() - start)
+        results[label] = {'first_token': _summary(ttft), 'total': _summary(total)}
+    return results
+
+
+def bench_http(recommender, concurrency: Sequence[int], n_requests: int) -> Dict[str, Dict]:
+    """/chat throughput from a separate load-generator process against an in-process uvicorn"""
+    import uvicorn
+    import main
+
+    main.init_components(recommender)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, log_level='warning'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f'http://127.0.0.1:{port}/chat'
+    payloads = [{'messages': [{'role': 'user', 'content': m}]} for m in CHAT_MESSAGES]
+    results = {}
+    try:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for level in concurrency:
+                results[f'c{level}'] = pool.submit(run_load, url, payloads, level, n_requests).result()
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+        # Let the next catalog size start from fresh components
+        if main.executor is not None:
+            main.executor.shutdown()
+        main.recommender = main.chat_handler = main.executor = main.handle_chat = None
+        main.init_status['status'] = 'starting'
+    return results
+
+
+def run_size(n_rows: int, args) -> Dict:
+    data_path = write_catalog(str(Path(args.work_dir) / 'data' / f'catalog-{n_rows}.csv'), n_rows)
+    shutil.rmtree(os.environ['CACHE_DIR'], ignore_errors=True)
+
+    print(f"[{n_rows} rows] cold start")
+    _, cold = build_recommender(str(data_path))
+    print(f"[{n_rows} rows] warm start")
+    recommender, warm = build_recommender(str(data_path))
+
+    result = {'startup_cold': cold, 'startup_warm': warm}
+    print(f"[{n_rows} rows] search")
+    result['search'] = bench_search(recommender, args.repeat)
+    print(f"[{n_rows} rows] chat")
+    result['chat'] = bench_chat(recommender, args.repeat)
+    result['chat_followups'] = bench_followups(recommender, args.repeat)
+    print(f"[{n_rows} rows] streamed answers")
+    result['chat_stream'] = bench_stream(recommender, args.repeat)
+    if not args.skip_http:
+        print(f"[{n_rows} rows] /chat throughput")
+        result['http'] = bench_http(recommender, args.concurrency, args.requests)
+    if resource is not None:
+        result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and name.endswith(('_ms', '_s', '_per_s', '_mb')):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print new vs baseline for every shared metric; return the names of regressions"""
+    new, old = _flatten(results), _flatten(baseline)
+    regressions = []
+    print(f"\n{'metric':60} {'baseline':>10} {'new':>10} {'change':>8}")
+    for name in sorted(new.keys() & old.keys()):
+        if not old[name]:
+            continue
+        ratio = new[name] / old[name]
+        # Throughput should go up; times and memory should go down
+        worse = ratio < 1 - tolerance if name.endswith('_per_s') else ratio > 1 + tolerance
+        unit = next(suffix for suffix in ('_per_s', '_ms', '_s', '_mb') if name.endswith(suffix))
+        worse = worse and abs(new[name] - old[name]) > NOISE_FLOOR[unit]
+        flag = '  REGRESSION' if worse else ''
+        print(f"{name:60} {old[name]:10.3f} {new[name]:10.3f} {(ratio - 1) * 100:+7.1f}%{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes over each query set")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200, help="/chat requests per concurrency level")
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR))
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    # Before any service module reads config: isolated caches and the stub encoder
+    os.environ['CACHE_DIR'] = str(Path(args.work_dir) / 'cache')
+    os.environ['SENTENCE_TRANSFORMER_MODEL'] = 'benchmark-stub-hashing-384'
+    stub_encoder.install()
+
+    results = {str(n_rows): run_size(n_rows, args) for n_rows in args.rows}
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('out', 'baseline')},
+        },
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Startup profile: where the time goes between launching the server and /ready.
+
+Starts `uvicorn main:app` in a fresh interpreter (with -X importtime) and polls
+/healthz and /ready. It then reports:
+- time until the port answers (liveness) and until initialization finishes (readiness)
+- the startup phases /ready returns
+- the packages that take longest to import
+
+The stub encoder is used unless --real-model is given, so runs are offline
+and reproducible.
+
+    python -m benchmarks.startup_profile --rows 10000 --target-s 5
+    python -m benchmarks.startup_profile --data-path data/sephora_products.csv --real-model --cold
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_WORK_DIR = REPO_DIR / 'cache' / 'bench'
+
+
+def _get(url: str) -> Tuple[Optional[int], Optional[Dict]]:
+    """Status and JSON body of a GET, or (None, None) if nothing is listening yet"""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None, None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def slowest_imports(log_path: str, top: int) -> List[Tuple[str, float]]:
+    """Packages by total import time of their own modules (ms), from an -X importtime log"""
+    totals: Dict[str, float] = {}
+    with open(log_path) as f:
+        for line in f:
+            if not line.startswith('import time:') or line.count('|') != 2:
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            try:
+                microseconds = int(own)
+            except ValueError:
+                continue  # the header line
+            package = name.strip().split('.')[0]
+            totals[package] = totals.get(package, 0.0) + microseconds / 1000
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def profile(args) -> Dict:
+    env = dict(os.environ)
+    env['CACHE_DIR'] = args.cache_dir
+    env['DATA_PATH'] = args.data_path
+    if not args.real_model:
+        env['SENTENCE_TRANSFORMER_MODEL'] = 'benchmark-stub-hashing-384'
+    if args.cold:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+
+    port = _free_port()
+    command = [sys.executable, '-X', 'importtime', '-m', 'benchmarks.startup_profile', '--serve', str(port)]
+    if args.real_model:
+        command.append('--real-model')
+
+    with tempfile.NamedTemporaryFile('w+', suffix='.importtime') as log:
+        start = time.perf_counter()
+        server = subprocess.Popen(command, cwd=REPO_DIR, env=env, stderr=log, stdout=subprocess.DEVNULL)
+        live = ready = None
+        body: Optional[Dict] = None
+        try:
+            while time.perf_counter() - start < args.timeout:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with status {server.returncode}")
+                status, body = _get(f'http://127.0.0.1:{port}/healthz' if live is None else
+                                    f'http://127.0.0.1:{port}/ready')
+                if live is None and status == 200:
+                    live = time.perf_counter() - start
+                elif live is not None and status == 200:
+                    ready = time.perf_counter() - start
+                    break
+                elif body and body.get('status') == 'failed':
+                    raise RuntimeError(f"Initialization failed: {body.get('error')}")
+                time.sleep(0.01)
+        finally:
+            server.terminate()
+            server.wait()
+        log.flush()
+        imports = slowest_imports(log.name, args.top)
+
+    return {
+        'live_s': live,
+        'ready_s': ready,
+        'phases_s': (body or {}).get('startup_seconds', {}) if ready is not None else {},
+        'slowest_imports_ms': dict(imports),
+    }
+
+
+def serve(port: int, real_model: bool):
+    """Child process: the server being profiled"""
+    if not real_model:
+        from benchmarks import stub_encoder
+        stub_encoder.install()
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-path', help="catalog CSV; a synthetic one of --rows rows by default")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR))
+    parser.add_argument('--cold', action='store_true', help="clear the cache first")
+    parser.add_argument('--real-model', action='store_true', help="load the configured embedding model")
+    parser.add_argument('--target-s', type=float, help="exit non-zero if /ready takes longer")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list")
+    parser.add_argument('--out', help="also write the profile as JSON")
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.real_model)
+        return
+
+    if not args.data_path:
+        from benchmarks.synthetic_catalog import write_catalog
+        args.data_path = str(write_catalog(
+            str(Path(args.work_dir) / 'data' / f'catalog-{args.rows}.csv'), args.rows
+        ))
+    args.cache_dir = str(Path(args.work_dir) / 'startup-cache')
+    result = profile(args)
+
+    for label, key in (('port answering (/healthz)', 'live_s'), ('ready (/ready)', 'ready_s')):
+        seconds = result[key]
+        print(f"{label:40} {seconds:8.2f}s" if seconds is not None else f"{label:40} not within {args.timeout:.0f}s")
+    print("\nStartup phases (in process):")
+    for phase, seconds in result['phases_s'].items():
+        print(f"  {phase:38} {seconds:8.3f}s")
+    print("\nSlowest imports:")
+    for package, ms in result['slowest_imports_ms'].items():
+        print(f"  {package:38} {ms:8.1f}ms")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.target_s is not None and (result['ready_s'] is None or result['ready_s'] > args.target_s):
+        print(f"\nStartup exceeded the {args.target_s:.1f}s target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
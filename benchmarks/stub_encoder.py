@@ -0,0 +1,59 @@
+"""Deterministic, offline stand-in for sentence_transformers.SentenceTransformer.
+
+Feature-hashes word tokens into a fixed-size unit vector, so runs need no model
+download or GPU and produce identical embeddings on every machine. install()
+registers it under the real module name before the service modules import it.
+"""
+import re
+import sys
+import types
+import zlib
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+class StubSentenceTransformer:
+    """Hashing encoder with the SentenceTransformer.encode signature the service uses"""
+
+    def __init__(self, model_name_or_path: str = 'stub', dim: int = 384, **kwargs):
+        self.model_name = model_name_or_path
+        self.dim = dim
+        # Tokens are lower-cased, like the uncased tokenizer of the default model
+        self.tokenizer = types.SimpleNamespace(do_lower_case=True)
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode('utf-8'))
+            bucket = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+            self._buckets[token] = bucket
+        return bucket
+
+    def encode(self, sentences: Sequence[str], batch_size: int = 32, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts: List[str] = [sentences] if single else list(sentences)
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(str(text).lower()):
+                column, sign = self._bucket(token)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(embeddings, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms > 0, norms, 1.0)
+        return embeddings[0] if single else embeddings
+
+
+def install(dim: int = 384) -> None:
+    """Make `from sentence_transformers import SentenceTransformer` return the stub"""
+    module = types.ModuleType('sentence_transformers')
+    module.SentenceTransformer = lambda name, **kwargs: StubSentenceTransformer(name, dim=dim, **kwargs)
+    sys.modules['sentence_transformers'] = module
@@ -0,0 +1,129 @@
+"""Deterministic Sephora-style catalog CSVs for benchmarking.
+
+    python -m benchmarks.synthetic_catalog --rows 100000 --out ./cache/bench/catalog-100000.csv
+"""
+import argparse
+import csv
+import random
+from pathlib import Path
+
+COLUMNS = ['pid', 'name', 'brand', 'price', 'Category', 'description', 'rating', 'reviews', 'ingredients']
+
+BRANDS = [
+    'Tatcha', 'Drunk Elephant', 'Glow Recipe', 'Fresh', 'Sunday Riley', 'The Ordinary', 'Laneige',
+    'Clinique', 'Origins', 'Farmacy', 'Youth To The People', 'Kiehl\'s Since 1851', 'Dr. Jart+',
+    'Summer Fridays', 'First Aid Beauty', 'Peter Thomas Roth', 'Shiseido', 'La Mer', 'Caudalie', 'Murad',
+]
+PRODUCT_TYPES = {
+    'Moisturizer': ['Cream', 'Gel', 'Lotion', 'Balm'],
+    'Face Serum': ['Serum', 'Oil', 'Liquid'],
+    'Cleanser': ['Gel', 'Foam', 'Oil', 'Balm'],
+    'Toner': ['Liquid', 'Mist'],
+    'Face Mask': ['Cream', 'Clay', 'Sheet', 'Gel'],
+    'Eye Cream': ['Cream', 'Gel'],
+    'Sunscreen': ['Lotion', 'Cream', 'Spray'],
+}
+ADJECTIVES = [
+    'Hydrating', 'Brightening', 'Soothing', 'Renewing', 'Firming', 'Clarifying', 'Daily',
+    'Overnight', 'Barrier', 'Radiance', 'Calming', 'Age-Defying', 'Gentle', 'Ultra', 'Dewy',
+]
+SKIN_TYPES = ['Normal', 'Dry', 'Combination', 'Oily', 'Sensitive']
+CONCERNS = [
+    'Dryness', 'Dullness and Uneven Texture', 'Fine Lines and Wrinkles', 'Acne and Blemishes',
+    'Loss of Firmness and Elasticity', 'Redness', 'Dark Spots', 'Pores', 'Oiliness',
+]
+BASE_INGREDIENTS = [
+    'Water', 'Aqua', 'Glycerin', 'Butylene Glycol', 'Propanediol', 'Dimethicone', 'Squalane',
+    'Caprylic/Capric Triglyceride', 'Cetearyl Alcohol', 'Cetyl Alcohol', 'Stearic Acid',
+    'Glyceryl Stearate', 'PEG-100 Stearate', 'Xanthan Gum', 'Carbomer', 'Sodium Hydroxide',
+    'Citric Acid', 'Disodium EDTA', 'Phenoxyethanol', 'Ethylhexylglycerin', 'Chlorphenesin',
+    'Pentylene Glycol', '1,2-Hexanediol', 'Caprylyl Glycol', 'Polysorbate 20', 'Allantoin',
+    'Panthenol', 'Sodium Hyaluronate', 'Hyaluronic Acid', 'Niacinamide', 'Tocopherol',
+    'Tocopheryl Acetate', 'Ascorbic Acid', 'Retinol', 'Retinyl Palmitate', 'Ceramide NP',
+    'Ceramide AP', 'Cholesterol', 'Peptides', 'Palmitoyl Tripeptide-1', 'Salicylic Acid',
+    'Glycolic Acid', 'Lactic Acid', 'Zinc Oxide', 'Titanium Dioxide', 'Aloe Barbadensis Leaf Juice',
+    'Camellia Sinensis Leaf Extract', 'Centella Asiatica Extract', 'Shea Butter', 'Jojoba Oil',
+]
+FLAGGED_INGREDIENTS = [
+    'Fragrance', 'Parfum', 'Methylparaben', 'Propylparaben', 'Butylparaben', 'Sodium Lauryl Sulfate',
+    'Sodium Laureth Sulfate', 'Alcohol Denat', 'Limonene', 'Linalool', 'Citronellol', 'Geraniol',
+    'DMDM Hydantoin', 'Diethyl Phthalate', 'Triclosan', 'Oxybenzone', 'Mineral Oil', 'Lanolin',
+]
+BOTANICALS = [f'{genus} {part} Extract' for genus in (
+    'Rosa Damascena', 'Chamomilla Recutita', 'Lavandula Angustifolia', 'Vitis Vinifera',
+    'Citrus Aurantium Dulcis', 'Glycyrrhiza Glabra', 'Vaccinium Macrocarpon', 'Hibiscus Sabdariffa',
+    'Ginkgo Biloba', 'Panax Ginseng', 'Moringa Oleifera', 'Curcuma Longa', 'Morus Alba',
+    'Calendula Officinalis', 'Helianthus Annuus', 'Oryza Sativa', 'Avena Sativa', 'Cucumis Sativus',
+    'Camellia Japonica', 'Prunus Amygdalus Dulcis', 'Persea Gratissima', 'Olea Europaea',
+) for part in ('Leaf', 'Flower', 'Root', 'Fruit', 'Seed')]
+
+
+def _description(rng: random.Random, product_type: str) -> str:
+    skin_types = ', '.join(rng.sample(SKIN_TYPES, rng.randint(1, 4)))
+    concerns = ', '.join(rng.sample(CONCERNS, rng.randint(1, 3)))
+    formulation = rng.choice(PRODUCT_TYPES[product_type])
+    highlights = ', '.join(rng.sample(BASE_INGREDIENTS[26:], 3))
+    return (
+        f"<p><b>What it is:</b> A {rng.choice(ADJECTIVES).lower()} {product_type.lower()} that "
+        f"{rng.choice(['visibly improves', 'helps restore', 'targets', 'smooths'])} "
+        f"{rng.choice(CONCERNS).lower()}.</p>"
+        f"<p><b>Skin Type:</b> {skin_types}<br><b>Skincare Concerns:</b> {concerns}"
+        f"<br><b>Formulation:</b> {formulation}</p>"
+        f"<p><b>Highlighted Ingredients:</b><br>- {highlights}</p>"
+        f"<p><b>What Else You Need to Know:</b> Suitable for daily use. "
+        f"{rng.choice(['Vegan.', 'Cruelty-free.', 'Clean at Sephora.', ''])}</p>"
+    )
+
+
+def _ingredients(rng: random.Random) -> str:
+    ingredients = ['Water'] + rng.sample(BASE_INGREDIENTS[1:], rng.randint(12, 30))
+    ingredients += rng.sample(BOTANICALS, rng.randint(2, 12))
+    if rng.random() < 0.4:
+        ingredients += rng.sample(FLAGGED_INGREDIENTS, rng.randint(1, 3))
+    return ', '.join(ingredients)
+
+
+def rows(n_rows: int, seed: int = 0):
+    """Yield n_rows catalog rows as lists in COLUMNS order"""
+    rng = random.Random(seed)
+    for i in range(n_rows):
+        product_type = rng.choice(list(PRODUCT_TYPES))
+        yield [
+            f'P{100000 + i}',
+            f'{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {product_type}',
+            rng.choice(BRANDS),
+            f'${rng.choice([12, 18, 22, 28, 34, 39, 45, 52, 58, 65, 72, 88, 95, 110, 145, 210])}.00',
+            'Skincare',
+            _description(rng, product_type),
+            round(rng.uniform(2.5, 5.0), 1) if rng.random() > 0.05 else '',
+            rng.randint(0, 5000),
+            _ingredients(rng) if rng.random() > 0.02 else '',
+        ]
+
+
+def write_catalog(path: str, n_rows: int, seed: int = 0) -> Path:
+    """Write a catalog CSV unless one with the same row count and seed already exists"""
+    path = Path(path)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows(n_rows, seed))
+    tmp_path.replace(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    print(write_catalog(args.out, args.rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 import os
 from dotenv import load_dotenv
-import torch  # Added this import
 
 load_dotenv()
 
 MODEL_CONFIG = {
     "model_path": os.getenv("MODEL_PATH", "./llm_models/llama-2-7b-chat.ggmlv3.q4_0.bin"),
     "max_length": 512,
+    "n_ctx": int(os.getenv("MODEL_N_CTX", "2048")),
     "temperature": 0.7,
     "top_p": 0.9,
-    "device": "cuda" if torch.cuda.is_available() else "cpu"
+    # "auto" lets the model library pick (CUDA when available) without importing torch here
+    "device": os.getenv("MODEL_DEVICE", "auto")
 }
 
+# /chat/stream answer generation: 'stub' (offline, deterministic) or 'llama_cpp' (MODEL_CONFIG's model_path,
+# needs llama-cpp-python). The evaluated system/catalog prompt prefix is cached for PROMPT_PREFIX_CACHE_SIZE
+# catalog versions. STUB_*_MS simulate model cost for the stub.
+ANSWER_GENERATOR = os.getenv("ANSWER_GENERATOR", "stub")
+PROMPT_PREFIX_CACHE_SIZE = int(os.getenv("PROMPT_PREFIX_CACHE_SIZE", "4"))
+STUB_PREFILL_MS_PER_KCHAR = float(os.getenv("STUB_PREFILL_MS_PER_KCHAR", "0"))
+STUB_TOKEN_DELAY_MS = float(os.getenv("STUB_TOKEN_DELAY_MS", "0"))
+
 DATA_PATH = os.getenv("DATA_PATH", "./data/sephora_products.csv")
 
 # Add some useful constants
@@ -20,8 +29,62 @@ MAX_RESPONSE_LENGTH = 1024
 DEFAULT_TOP_K = 3
 
 # Model paths and configurations
-SENTENCE_TRANSFORMER_MODEL = 'all-MiniLM-L6-v2'
+SENTENCE_TRANSFORMER_MODEL = os.getenv("SENTENCE_TRANSFORMER_MODEL", 'all-MiniLM-L6-v2')
+
+# Query encoding: concurrent queries are batched for up to QUERY_BATCH_MAX_WAIT_MS
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "2"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+
+# Vector index: 'exact' (brute force) or 'ivf' (approximate). IVF_N_PROBE trades recall for latency.
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact")
+IVF_N_LISTS = int(os.getenv("IVF_N_LISTS", "0"))  # 0 = sqrt(catalog size)
+IVF_N_PROBE = int(os.getenv("IVF_N_PROBE", "8"))
+
+# Scoring precision: 'float32', or 'float16' / 'int8' copies scanned in place of the full matrix,
+# with the best k * RESCORE_FACTOR candidates rescored at full precision
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32")
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+# Dupe finder: MinHash signature length and LSH bands (more bands find lower-overlap formulas)
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "48"))
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", "24"))
+
+# Catalog ingestion: the CSV is read INGEST_CHUNK_ROWS rows at a time and chunks are preprocessed
+# (HTML parsing, ingredient analysis) on INGEST_WORKERS processes; embeddings are encoded and
+# written EMBED_BATCH_ROWS rows at a time as chunks finish
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))
+EMBED_BATCH_ROWS = int(os.getenv("EMBED_BATCH_ROWS", "4096"))
+
+# On-disk caches (embedding store, ...)
+CACHE_DIR = os.getenv("CACHE_DIR", "./cache")
+
+# /chat execution: 'inline' (on the event loop), 'thread' or 'process' pool.
+# Requests beyond CHAT_WORKERS in flight plus CHAT_MAX_QUEUE waiting get a 503.
+CHAT_EXECUTION_MODE = os.getenv("CHAT_EXECUTION_MODE", "thread")
+CHAT_WORKERS = int(os.getenv("CHAT_WORKERS", "4"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_RETRY_AFTER_SECONDS = int(os.getenv("CHAT_RETRY_AFTER_SECONDS", "1"))
+
+# Requests slower than SLOW_REQUEST_MS are logged with their per-stage timings
+# (JSON lines appended to SLOW_REQUEST_LOG, or stdout if unset); 0 disables
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", "")
+
+# Chat sessions: each conversation keeps its best SESSION_MAX_RANKED candidates so follow-ups
+# ("show me more", "cheaper ones") page or narrow them without re-ranking the catalog.
+# At most SESSION_MAX_COUNT sessions are kept; idle ones expire after SESSION_TTL_SECONDS
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_RANKED = int(os.getenv("SESSION_MAX_RANKED", "500"))
+
+# Catalog admin endpoints (/admin/...) require this value in the X-Admin-Token header; empty disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Build the recommender on a background thread so the port opens immediately; /ready reports when it is done
+BACKGROUND_INIT = os.getenv("BACKGROUND_INIT", "1") != "0"
 
 # API configurations
 API_HOST = "127.0.0.1"
-API_PORT = 3000
\ No newline at end of file
+API_PORT = 3000
@@ -1,15 +1,37 @@
+import time
+# Import time is part of the startup profile reported by /ready
+_started = time.perf_counter()
+import asyncio
+import hmac
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Awaitable, Callable, Generator, Optional
 sys.path.append(str(Path(__file__).parent))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from models.pydantic_models import ChatRequest, ChatResponse
-from utils.chat_handler import ChatHandler
+from starlette.concurrency import run_in_threadpool
+from models.pydantic_models import (
+    ChatRequest, ChatResponse, BatchRecommendationRequest, CompareRequest, ProductComparisonMatrix,
+    ProductUpsertRequest, ProductDeleteRequest
+)
+from utils.answer_generator import load_generator
+from utils.chat_handler import ChatHandler, init_worker, handle_chat_in_worker
 from utils.product_recommender import ProductRecommender
-from config import DATA_PATH
+from utils.request_executor import RequestExecutor, Overloaded
+from utils.session_store import SessionStore
+from utils.metrics import REGISTRY, STARTUP_SECONDS, configure_slow_request_log, startup_phase
+from config import (
+    DATA_PATH, CHAT_EXECUTION_MODE, CHAT_WORKERS, CHAT_MAX_QUEUE, CHAT_RETRY_AFTER_SECONDS,
+    SLOW_REQUEST_MS, SLOW_REQUEST_LOG, ADMIN_TOKEN, BACKGROUND_INIT, SESSION_TTL_SECONDS
+)
 import uvicorn
 
+STARTUP_SECONDS.set(time.perf_counter() - _started, 'imports')
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -21,20 +43,277 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-try:
-    recommender = ProductRecommender(DATA_PATH)
-    chat_handler = ChatHandler(recommender)
-except Exception as e:
-    print(f"Error initializing components: {str(e)}")
-    raise
+# Components, built at startup (or handed in by serve.py after forking)
+recommender: Optional[ProductRecommender] = None
+chat_handler: Optional[ChatHandler] = None
+executor: Optional[RequestExecutor] = None
+handle_chat = None
+# Set by serve.py before the server starts: the catalog loaded in the parent, without a model,
+# and how many processes serve the app
+preloaded_recommender: Optional[ProductRecommender] = None
+worker_count = 1
+
+# Reported by /ready: starting, ready or failed, plus where startup time went
+init_status = {
+    'status': 'starting',
+    'error': None,
+    'startup_seconds': {'imports': time.perf_counter() - _started},
+}
+
+# Catalog updates run one at a time, off the event loop
+update_executor = ThreadPoolExecutor(1, thread_name_prefix='catalog-update')
+
+def init_components(preloaded: Optional[ProductRecommender] = None):
+    """Initialize components, reusing a preloaded recommender if given"""
+    global recommender, chat_handler, executor, handle_chat
+    if executor is not None:
+        return
+    timings = init_status['startup_seconds']
+    try:
+        if CHAT_EXECUTION_MODE == 'process':
+            # Each pool process builds its own recommender; start them all before reporting ready
+            pool = RequestExecutor(
+                'process', CHAT_WORKERS, CHAT_MAX_QUEUE,
+                initializer=init_worker, initargs=(DATA_PATH,)
+            )
+            with startup_phase('worker_pool', timings):
+                pool.warm_up()
+            handle_chat = handle_chat_in_worker
+        else:
+            if preloaded is not None and preloaded.embedding_model is None:
+                with startup_phase('load_model', preloaded.startup_timings):
+                    preloaded.load_model()
+            recommender = preloaded or ProductRecommender(DATA_PATH)
+            timings.update(recommender.startup_timings)
+            with startup_phase('answer_generator', timings):
+                generator = load_generator()
+            sessions = None
+            if worker_count > 1:
+                # A follow-up could land on another worker, which would silently start over
+                print("Chat sessions are disabled with several workers")
+                sessions = SessionStore(0, SESSION_TTL_SECONDS)
+            chat_handler = ChatHandler(recommender, sessions=sessions, generator=generator)
+            pool = RequestExecutor(CHAT_EXECUTION_MODE, CHAT_WORKERS, CHAT_MAX_QUEUE)
+            handle_chat = chat_handler.handle_chat_json
+        executor = pool
+    except Exception as e:
+        print(f"Error initializing components: {str(e)}")
+        init_status.update(status='failed', error=str(e))
+        raise
+    register_metrics()
+    timings['ready'] = time.perf_counter() - _started
+    STARTUP_SECONDS.set(timings['ready'], 'ready')
+    init_status['status'] = 'ready'
+    print(f"Ready in {timings['ready']:.2f}s")
+
+def init_in_background():
+    """Build the components on a daemon thread so the server can accept connections meanwhile"""
+    def run():
+        try:
+            init_components(preloaded_recommender)
+        except Exception:
+            pass  # Already logged; /ready reports the failure
+
+    threading.Thread(target=run, name='init-components', daemon=True).start()
+
+class ClosingStreamingResponse(StreamingResponse):
+    """Streaming response that awaits on_close() once sending ends, whether finished, failed or disconnected"""
+
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+def close_generator(generator: Generator):
+    """Close a generator that may still be running on another thread"""
+    while True:
+        try:
+            generator.close()
+            return
+        except ValueError:
+            # Mid-step on a threadpool thread; it yields (or ends) shortly
+            time.sleep(0.01)
+
+def require_ready():
+    """Reject requests with 503 until the components are initialized"""
+    if init_status['status'] != 'ready':
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service is {init_status['status']}",
+            headers={"Retry-After": str(CHAT_RETRY_AFTER_SECONDS)}
+        )
+
+def register_metrics():
+    """Expose executor and cache statistics on /metrics"""
+    configure_slow_request_log(SLOW_REQUEST_MS, SLOW_REQUEST_LOG)
+    REGISTRY.register_collector('chat_executor', executor.stats)
+    if recommender is not None:
+        REGISTRY.register_collector('query_encoder', lambda: recommender.query_encoder.stats())
+        REGISTRY.register_collector('product_cache', lambda: recommender.product_cache.stats())
+        REGISTRY.register_collector('ingredient_index', lambda: recommender.ingredient_index.stats())
+        REGISTRY.register_collector('chat_sessions', chat_handler.sessions.stats)
+        REGISTRY.register_collector('answer_generator', chat_handler.generator.stats)
+
+@app.on_event("startup")
+def startup():
+    if BACKGROUND_INIT:
+        init_in_background()
+    else:
+        init_components(preloaded_recommender)
+
+@app.on_event("shutdown")
+def shutdown():
+    if executor is not None:
+        executor.shutdown()
+    update_executor.shutdown(wait=False)
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
+    require_ready()
     try:
-        return chat_handler.handle_chat(request)
+        body = await executor.run(handle_chat, request)
+        return Response(content=body, media_type="application/json")
+    except Overloaded:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": str(CHAT_RETRY_AFTER_SECONDS)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, accept: Optional[str] = Header(None)):
+    """Stream the retrieved products, then the generated answer token by token.
+
+    NDJSON lines {"event": "products" | "token" | "done", ...}, or Server-Sent
+    Events when the client accepts text/event-stream.
+    """
+    require_ready()
+    if chat_handler is None:
+        raise HTTPException(status_code=503, detail="Streaming needs an in-process recommender")
+    # The stream holds a chat executor slot until it ends, generation included
+    try:
+        await executor.acquire()
+    except Overloaded:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": str(CHAT_RETRY_AFTER_SECONDS)}
+        )
+    try:
+        events = await executor.run_reserved(chat_handler.stream_chat, request)
+    except Exception as e:
+        executor.release()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def close():
+        try:
+            # Stops generation for a client that disconnected mid-stream
+            await run_in_threadpool(close_generator, events)
+        finally:
+            executor.release()
+
+    if accept and 'text/event-stream' in accept:
+        body = (f'event: {name}\ndata: {data}\n\n' for name, data in events)
+        return ClosingStreamingResponse(body, close, media_type="text/event-stream")
+    body = (f'{{"event":"{name}",{data[1:]}\n' for name, data in events)
+    return ClosingStreamingResponse(body, close, media_type="application/x-ndjson")
+
+@app.post("/recommend/batch")
+def recommend_batch(request: BatchRecommendationRequest):
+    """Stream one NDJSON line per query: {"index": i, "products": [...]}"""
+    require_ready()
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="Batch recommendations need an in-process recommender")
+
+    # One catalog version for the whole stream, even if a reload lands midway
+    pinned = recommender.pinned()
+
+    def lines():
+        for index, rows in pinned.recommend_batch(request.queries):
+            products = pinned.product_cache.products_json(rows, request.fields)
+            yield f'{{"index":{index},"products":{products}}}\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/compare", response_model=ProductComparisonMatrix)
+def compare(request: CompareRequest):
+    require_ready()
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="Comparisons need an in-process recommender")
+    try:
+        return recommender.compare_many(request.pids)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown product id: {e.args[0]}")
+
+async def run_catalog_update(token: Optional[str], update, *args):
+    """Run a recommender update on the update thread and return its summary"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Catalog updates are disabled: ADMIN_TOKEN is not set")
+    if token is None or not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    require_ready()
+    # An update would reach only the process handling it; the others would keep the old catalog
+    if worker_count > 1 or CHAT_EXECUTION_MODE == 'process':
+        raise HTTPException(
+            status_code=409,
+            detail="Catalog updates need a single serving process; update the CSV and restart the workers"
+        )
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="Catalog updates need an in-process recommender")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(update_executor, update, *args)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/products")
+async def upsert_products(request: ProductUpsertRequest, x_admin_token: Optional[str] = Header(None)):
+    """Add or replace products by pid"""
+    products = [product.dict(by_alias=True) for product in request.products]
+    return await run_catalog_update(x_admin_token, lambda: recommender.upsert_products(products))
+
+@app.post("/admin/products/delete")
+async def delete_products(request: ProductDeleteRequest, x_admin_token: Optional[str] = Header(None)):
+    return await run_catalog_update(x_admin_token, lambda: recommender.delete_products(request.pids))
+
+@app.post("/admin/reload")
+async def reload_catalog(x_admin_token: Optional[str] = Header(None)):
+    """Re-read the configured catalog CSV, reprocessing and re-embedding only changed rows"""
+    return await run_catalog_update(x_admin_token, lambda: recommender.reload())
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: 200 while starting or ready; 503 once initialization has failed, so the process gets restarted"""
+    if init_status['status'] == 'failed':
+        return JSONResponse(status_code=503, content={"status": "failed", "error": init_status['error']})
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once the components are initialized, 503 while starting or after a failure"""
+    return JSONResponse(status_code=200 if init_status['status'] == 'ready' else 503, content=init_status)
+
+@app.get("/stats")
+async def stats():
+    require_ready()
+    result = {"executor": executor.stats()}
+    if recommender is not None:
+        result["query_encoder"] = recommender.query_encoder.stats()
+        result["chat_sessions"] = chat_handler.sessions.stats()
+        result["answer_generator"] = chat_handler.generator.stats()
+    return result
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=3000)
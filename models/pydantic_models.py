@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Union
 
 # Base message model
@@ -20,6 +20,13 @@ class ProductComparison(BaseModel):
     rating_difference: float
     ingredient_overlap: float
 
+class ProductComparisonMatrix(BaseModel):
+    pids: List[str]
+    names: List[str]
+    ingredient_overlap: List[List[float]]
+    price_difference: List[List[float]]
+    rating_difference: List[List[float]]
+
 class SephoraProduct(BaseModel):
     pid: str
     name: str
@@ -35,13 +42,76 @@ class SephoraProduct(BaseModel):
     formulation: Optional[str]
     ingredient_analysis: Optional[IngredientAnalysis]
 
+def check_product_fields(cls, fields):
+    if fields is not None:
+        unknown = [f for f in fields if f not in SephoraProduct.__fields__]
+        if unknown:
+            raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    return fields
+
 # Request/Response models
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     filters: Optional[Dict[str, Union[str, List[str], List[float]]]] = None
     excluded_ingredients: Optional[List[str]] = None
+    # Return only these SephoraProduct fields, e.g. ["pid", "name", "brand", "price", "rating"]
+    fields: Optional[List[str]] = None
+    # Continue an earlier conversation: follow-ups page or narrow its cached results
+    conversation_id: Optional[str] = None
+    # next_cursor from an earlier response in the conversation: return that page
+    cursor: Optional[str] = None
+    n_results: int = Field(3, ge=1, le=50)
+
+    _check_fields = validator('fields', allow_reuse=True)(check_product_fields)
+
+    @validator('cursor')
+    def check_cursor(cls, v, values):
+        if v is not None and not values.get('conversation_id'):
+            raise ValueError("cursor requires conversation_id")
+        return v
 
 class ChatResponse(BaseModel):
     response: str
     products: Optional[List[SephoraProduct]] = None
-    comparison: Optional[ProductComparison] = None
\ No newline at end of file
+    comparison: Optional[ProductComparison] = None
+    total_results: Optional[int] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+    conversation_id: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+# Batch recommendation models
+class RecommendationQuery(BaseModel):
+    query: str
+    filters: Optional[Dict[str, Union[str, List[str], List[float]]]] = None
+    excluded_ingredients: Optional[List[str]] = None
+    n_results: int = Field(3, ge=1, le=100)
+
+class BatchRecommendationRequest(BaseModel):
+    queries: List[RecommendationQuery]
+    fields: Optional[List[str]] = None
+
+    _check_fields = validator('fields', allow_reuse=True)(check_product_fields)
+
+class CompareRequest(BaseModel):
+    pids: List[str] = Field(..., min_items=2, max_items=50)
+
+class CatalogProduct(BaseModel):
+    """A product as it appears in the catalog CSV"""
+    pid: str
+    name: str
+    brand: str = ''
+    price: Union[float, str] = 0.0
+    category: str = Field('', alias='Category')
+    description: str = ''
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    ingredients: str = ''
+
+    class Config:
+        allow_population_by_field_name = True
+
+class ProductUpsertRequest(BaseModel):
+    products: List[CatalogProduct] = Field(..., min_items=1)
+
+class ProductDeleteRequest(BaseModel):
+    pids: List[str] = Field(..., min_items=1)
@@ -0,0 +1,130 @@
+"""Multi-worker server: load the catalog once, then fork workers that share it.
+
+The parent builds the ProductRecommender's catalog (snapshot, memory-mapped
+embeddings, indexes) without the embedding model, so torch and CUDA are only
+ever initialized in the workers, then forks N uvicorn workers on one listening
+socket. Each worker loads its own model during startup.
+
+The memory-mapped embedding matrix and the NumPy index arrays stay shared until
+written. Python objects (DataFrame object columns, cached product fields) have
+their pages copied as their reference counts change; gc.freeze() only keeps the
+collector from doing the same. --memory-report prints each worker's Private
+memory, the part it does not share.
+
+    python serve.py --workers 4 --port 3000 --memory-report
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+sys.path.append(str(Path(__file__).parent))
+
+import uvicorn
+import main
+from utils.product_recommender import ProductRecommender
+from config import DATA_PATH, API_HOST, API_PORT
+
+
+def worker_memory(pid: int) -> Dict[str, int]:
+    """Resident, proportional and private memory of a process in kB (Linux)"""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        return {}
+    memory['Private'] = memory.pop('Private_Clean', 0) + memory.pop('Private_Dirty', 0)
+    return memory
+
+
+def run_worker(sock: socket.socket, recommender: ProductRecommender, host: str, port: int):
+    """Forked child: serve on the shared socket; this worker's model loads during app startup"""
+    main.preloaded_recommender = recommender
+    config = uvicorn.Config(main.app, host=host, port=port)
+    uvicorn.Server(config).run(sockets=[sock])
+    os._exit(0)
+
+
+def spawn(sock, recommender, host, port) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            run_worker(sock, recommender, host, port)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main_loop(args):
+    if not hasattr(os, 'fork'):
+        print("Pre-fork serving needs os.fork; falling back to a single uvicorn process")
+        uvicorn.run(main.app, host=args.host, port=args.port)
+        return
+
+    recommender = ProductRecommender(args.data_path, load_model=False)
+    # Inherited by the workers: catalog updates are refused when several processes serve
+    main.worker_count = args.workers
+    gc.collect()
+    # Keep the collector from touching (and so un-sharing) the preloaded objects
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {spawn(sock, recommender, args.host, args.port) for _ in range(args.workers)}
+    print(f"Serving on {args.host}:{args.port} with {len(workers)} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    if args.memory_report:
+        time.sleep(args.memory_report)
+        for pid in sorted(workers):
+            print(f"worker {pid}: {worker_memory(pid)} kB")
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited, restarting")
+            workers.add(spawn(sock, recommender, args.host, args.port))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--data-path', default=DATA_PATH)
+    parser.add_argument('--memory-report', type=float, default=0,
+                        help="print each worker's RSS/PSS/private memory this many seconds after start")
+    main_loop(parser.parse_args())
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_catalog import write_catalog
+from utils.catalog_ingest import ingest_catalog
+from utils.catalog_state import CatalogState
+from utils.ingredient_analyzer import IngredientAnalyzer
+from utils.text_column import TextColumnWriter
+
+
+def ingest(data_path, tmp_path, name, reuse=None, stats=None):
+    writer = TextColumnWriter(str(tmp_path / name))
+    frames = [chunk for chunk, _ in ingest_catalog(
+        str(data_path), IngredientAnalyzer(), writer, chunk_rows=100, reuse=reuse, stats=stats
+    )]
+    return pd.concat(frames, ignore_index=True), writer.close()
+
+
+@pytest.fixture(scope='module')
+def catalog(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('ingest')
+    data_path = write_catalog(str(tmp_path / 'catalog.csv'), 300)
+    df, descriptions = ingest(data_path, tmp_path, 'first')
+    embeddings = np.zeros((len(df), 8), dtype=np.float32)
+    return data_path, tmp_path, CatalogState(df, descriptions, embeddings, IngredientAnalyzer())
+
+
+def test_unchanged_catalog_is_reused_as_is(catalog):
+    data_path, tmp_path, state = catalog
+    stats = {}
+    df, descriptions = ingest(data_path, tmp_path, 'unchanged', reuse=state, stats=stats)
+    assert stats == {'rows': 300, 'reprocessed': 0}
+    assert df.dtypes.to_dict() == state.df.dtypes.to_dict()
+    pd.testing.assert_frame_equal(df, state.df)
+    assert descriptions.tolist() == state.descriptions.tolist()
+
+
+def test_changed_rows_are_reprocessed_in_file_order(catalog):
+    data_path, tmp_path, state = catalog
+    raw = pd.read_csv(data_path, dtype=str)
+    raw.loc[[5, 150], 'price'] = '$1.00'
+    changed_path = tmp_path / 'changed.csv'
+    raw.to_csv(changed_path, index=False)
+    stats = {}
+    df, _ = ingest(changed_path, tmp_path, 'changed', reuse=state, stats=stats)
+    assert stats == {'rows': 300, 'reprocessed': 2}
+    assert df['pid'].tolist() == state.df['pid'].tolist()
+    assert df['price'].dtype == np.float64
+    assert df.loc[[5, 150], 'price'].tolist() == [1.0, 1.0]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from utils.quantized_embeddings import QuantizedEmbeddings
+from utils.vector_index import BruteForceIndex, recall_at_k
+
+
+@pytest.fixture(scope='module')
+def embeddings():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3000, 64))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def queries():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(20, 64))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        QuantizedEmbeddings(np.zeros((2, 4), dtype=np.float32), 'int4')
+
+
+@pytest.mark.parametrize('precision, tolerance', [('float16', 1e-3), ('int8', 2e-2)])
+def test_scores_match_float32(embeddings, queries, precision, tolerance):
+    quantized = QuantizedEmbeddings(embeddings, precision, chunk_rows=256)
+    expected = queries @ embeddings.T
+    np.testing.assert_allclose(quantized.scores(queries), expected, atol=tolerance)
+    np.testing.assert_allclose(quantized.scores(queries[0]), expected[0], atol=tolerance)
+
+
+@pytest.mark.parametrize('precision', ['float16', 'int8'])
+def test_scores_of_selected_rows(embeddings, queries, precision):
+    quantized = QuantizedEmbeddings(embeddings, precision, chunk_rows=100)
+    rows = np.array([2999, 5, 1700, 5, 0])
+    np.testing.assert_allclose(quantized.scores(queries[3], rows), quantized.scores(queries[3])[rows], atol=1e-6)
+    assert quantized.scores(queries[3], np.empty(0, dtype=np.intp)).shape == (0,)
+
+
+def test_int8_uses_a_quarter_of_the_memory(embeddings):
+    quantized = QuantizedEmbeddings(embeddings, 'int8')
+    assert quantized.codes.dtype == np.int8
+    assert quantized.nbytes == embeddings.nbytes // 4 + 4 * len(embeddings)
+
+
+def test_zero_rows_are_kept():
+    embeddings = np.zeros((3, 8), dtype=np.float32)
+    embeddings[1] = 1.0
+    scores = QuantizedEmbeddings(embeddings, 'int8').scores(np.ones(8, dtype=np.float32))
+    np.testing.assert_allclose(scores, [0.0, 8.0, 0.0], atol=1e-5)
+
+
+@pytest.mark.parametrize('precision', ['float16', 'int8'])
+def test_rescored_search_matches_exact_search(embeddings, queries, precision):
+    exact = BruteForceIndex(embeddings)
+    quantized = BruteForceIndex(embeddings, QuantizedEmbeddings(embeddings, precision), rescore_factor=4)
+    assert recall_at_k(quantized, exact, queries, 10) >= 0.99
+    # Returned scores are the full-precision ones
+    rows, scores = quantized.search(queries[0], 10)
+    np.testing.assert_allclose(scores, embeddings[rows] @ queries[0], rtol=1e-6)
+
+
+def test_rescored_search_respects_mask(embeddings, queries):
+    mask = np.zeros(len(embeddings), dtype=bool)
+    mask[::3] = True
+    exact = BruteForceIndex(embeddings)
+    quantized = BruteForceIndex(embeddings, QuantizedEmbeddings(embeddings, 'int8'))
+    for query in queries[:5]:
+        rows, _ = quantized.search(query, 10, mask)
+        expected, _ = exact.search(query, 10, mask)
+        assert mask[rows].all()
+        assert len(np.intersect1d(rows, expected)) >= 9
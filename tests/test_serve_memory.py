@@ -0,0 +1,114 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import List
+import pytest
+from benchmarks.synthetic_catalog import write_catalog
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+N_ROWS = 20_000
+EMBEDDING_DIM = 384
+
+# Put first on PYTHONPATH so serve.py and the encoder process it spawns both get the offline stub
+STUB_PACKAGE = "from benchmarks.stub_encoder import StubSentenceTransformer as SentenceTransformer\n"
+
+pytestmark = pytest.mark.skipif(
+    not Path('/proc/self/smaps_rollup').exists(), reason="needs Linux /proc/<pid>/smaps_rollup"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _workers(pid: int) -> List[int]:
+    """Forked children of pid; they share its command line, unlike multiprocessing helper processes"""
+    command = Path(f'/proc/{pid}/cmdline').read_bytes()
+    children = []
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            # The parent pid is the second field after the parenthesized command name
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+            if int(fields[1]) == pid and (stat.parent / 'cmdline').read_bytes() == command:
+                children.append(int(stat.parent.name))
+        except OSError:
+            continue
+    return children
+
+
+def _post(url: str, body: dict) -> int:
+    request = urllib.request.Request(url, json.dumps(body).encode(), {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+        return response.status
+
+
+def _wait_ready(url: str, server: subprocess.Popen, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def test_workers_share_the_catalog(tmp_path):
+    """Each serve.py worker's private memory stays well below the catalog and embeddings it shares"""
+    pytest.importorskip('uvicorn')
+    from serve import worker_memory
+
+    data_path = write_catalog(str(tmp_path / 'catalog.csv'), N_ROWS)
+    cache_dir = tmp_path / 'cache'
+    stub_dir = tmp_path / 'stub' / 'sentence_transformers'
+    stub_dir.mkdir(parents=True)
+    (stub_dir / '__init__.py').write_text(STUB_PACKAGE)
+    port = _free_port()
+    env = dict(
+        os.environ, CACHE_DIR=str(cache_dir), INGEST_WORKERS='1', BACKGROUND_INIT='0',
+        PYTHONPATH=os.pathsep.join([str(stub_dir.parent), str(REPO_DIR)])
+    )
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--workers', '2', '--host', '127.0.0.1', '--port', str(port),
+         '--data-path', str(data_path)],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # Both workers must be up before any is measured; /ready answers from either
+        deadline = time.monotonic() + 300
+        while len(_workers(server.pid)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for _ in range(10):
+            _wait_ready(f"http://127.0.0.1:{port}/ready", server)
+        for query in ('hydrating serum for dry skin', 'gentle cleanser without fragrance', 'oil free sunscreen'):
+            for _ in range(5):
+                assert _post(f"http://127.0.0.1:{port}/chat",
+                             {'messages': [{'role': 'user', 'content': query}]}) == 200
+        time.sleep(1)
+
+        workers = _workers(server.pid)
+        assert len(workers) == 2
+        shared_kb = (
+            N_ROWS * EMBEDDING_DIM * 4 + sum(f.stat().st_size for f in (cache_dir / 'catalog').iterdir())
+        ) // 1024
+        for pid in workers:
+            memory = worker_memory(pid)
+            assert memory['Pss'] < memory['Rss']
+            # The catalog and embeddings loaded by the parent stay shared with each worker
+            assert memory['Private'] < shared_kb / 2, (memory, shared_kb)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
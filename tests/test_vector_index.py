@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from utils.vector_index import (
+    IVF_MIN_ROWS, BruteForceIndex, IVFIndex, VectorIndex, create_vector_index, recall_at_k
+)
+
+
+def clustered_embeddings(n_rows: int = 2000, dim: int = 32, n_clusters: int = 20, seed: int = 0) -> np.ndarray:
+    """Unit vectors around a few random centres, like product embeddings of a catalog"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_clusters, dim))
+    vectors = centres[rng.integers(0, n_clusters, n_rows)] + 0.3 * rng.normal(size=(n_rows, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    embeddings = clustered_embeddings()
+    queries = clustered_embeddings(50, seed=1)
+    return embeddings, queries
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex(np.zeros((1, 4), dtype=np.float32))
+
+
+def test_brute_force_matches_numpy(catalog):
+    embeddings, queries = catalog
+    index = BruteForceIndex(embeddings)
+    rows, scores = index.search(queries[0], 10)
+    expected = np.argsort(-(embeddings @ queries[0]), kind='stable')[:10]
+    assert rows.tolist() == expected.tolist()
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_ivf_recall_against_brute_force(catalog):
+    embeddings, queries = catalog
+    exact = BruteForceIndex(embeddings)
+    ivf = IVFIndex(embeddings, n_lists=32, n_probe=8)
+    assert recall_at_k(ivf, exact, queries, 10) >= 0.9
+
+
+def test_ivf_probing_every_list_is_exact(catalog):
+    embeddings, queries = catalog
+    exact = BruteForceIndex(embeddings)
+    ivf = IVFIndex(embeddings, n_lists=32, n_probe=32)
+    assert recall_at_k(ivf, exact, queries, 10) == 1.0
+
+
+def test_ivf_recall_with_filters(catalog):
+    embeddings, queries = catalog
+    rng = np.random.default_rng(2)
+    # A broad filter (probed lists) and a selective one (scanned directly)
+    masks = [rng.random(len(embeddings)) < (0.5 if i % 2 else 0.01) for i in range(len(queries))]
+    exact = BruteForceIndex(embeddings)
+    ivf = IVFIndex(embeddings, n_lists=32, n_probe=8)
+    assert recall_at_k(ivf, exact, queries, 10, masks) >= 0.9
+    for query, mask in zip(queries, masks):
+        rows, _ = ivf.search(query, 10, mask)
+        assert mask[rows].all()
+
+
+def test_ivf_falls_back_to_brute_force_for_small_catalogs():
+    embeddings = clustered_embeddings(IVF_MIN_ROWS - 1)
+    index = create_vector_index(embeddings, 'ivf', n_lists=16, n_probe=2)
+    assert isinstance(index, BruteForceIndex)
+    assert isinstance(create_vector_index(clustered_embeddings(IVF_MIN_ROWS), 'ivf'), IVFIndex)
+
+
+def test_empty_catalog():
+    embeddings = np.empty((0, 32), dtype=np.float32)
+    index = create_vector_index(embeddings, 'ivf', n_lists=0, n_probe=8)
+    rows, scores = index.search(np.ones(32, dtype=np.float32), 5)
+    assert len(rows) == 0 and len(scores) == 0
+    rows, _ = index.search(np.ones(32, dtype=np.float32), 5, np.zeros(0, dtype=bool))
+    assert len(rows) == 0
+    with pytest.raises(ValueError):
+        IVFIndex(embeddings)
+
+
+def test_tiny_catalog():
+    embeddings = clustered_embeddings(3)
+    for index in (IVFIndex(embeddings, n_probe=1), create_vector_index(embeddings, 'ivf')):
+        rows, _ = index.search(embeddings[1], 5)
+        assert sorted(rows.tolist()) == [0, 1, 2]
+        assert rows[0] == 1
@@ -0,0 +1,218 @@
+import hashlib
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from queue import Queue
+from typing import Dict, Iterator, List, Tuple
+
+# Llama-2 chat framing: the system prompt sits inside the first [INST] block
+PROMPT_PREFIX_TEMPLATE = "[INST] <<SYS>>\n{system}\n<</SYS>>\n\n"
+PROMPT_SUFFIX_END = " [/INST]"
+
+# Product lines in a prompt suffix, as written by ChatHandler
+_PRODUCT_LINE = re.compile(r'^\d+\. (.+?) by (.+?) \(\$([\d.]+)\)(.*)$', re.MULTILINE)
+_TOKEN = re.compile(r'\S+\s*')
+
+# Marks the end of a generated answer in LlamaCppGenerator's token queue
+_END = object()
+
+
+class AnswerGenerator(ABC):
+    """Streams answer tokens for a prompt made of a shared prefix and a per-request suffix.
+
+    The prefix (system instructions plus the catalog overview) is the same for
+    every request on a catalog version. Its evaluated state is kept in an LRU
+    cache keyed by the prefix text, so each request only evaluates its suffix.
+    """
+
+    name = 'base'
+
+    def __init__(self, prefix_cache_size: int = 4):
+        self.prefix_cache_size = prefix_cache_size
+        self._prefixes: OrderedDict = OrderedDict()  # prefix digest -> state
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @abstractmethod
+    def prefill(self, prefix: str):
+        """Evaluate a prompt prefix and return state generate() can continue from"""
+
+    @abstractmethod
+    def generate(self, state, suffix: str, max_tokens: int) -> Iterator[str]:
+        """Yield the answer's tokens (as text) after the prefix in state and suffix"""
+
+    def prefix_state(self, prefix: str) -> Tuple[object, bool]:
+        """(state for prefix, whether it came from the cache)"""
+        key = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+        with self._lock:
+            state = self._prefixes.get(key)
+            if state is not None:
+                self._prefixes.move_to_end(key)
+                self._hits += 1
+                return state, True
+            self._misses += 1
+        # Evaluated outside the lock; concurrent misses on a new prefix each prefill once
+        state = self.prefill(prefix)
+        if self.prefix_cache_size > 0:
+            with self._lock:
+                self._prefixes[key] = state
+                while len(self._prefixes) > self.prefix_cache_size:
+                    self._prefixes.popitem(last=False)
+        return state, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'prefixes': len(self._prefixes), 'prefix_hits': self._hits, 'prefix_misses': self._misses}
+
+
+class StubGenerator(AnswerGenerator):
+    """Deterministic offline generator: writes a fixed-form answer from the products in the prompt.
+
+    prefill_ms_per_kchar and token_delay_ms simulate model cost, so prefix reuse
+    and time to first token can be measured without the model file.
+    """
+
+    name = 'stub'
+
+    def __init__(self, prefix_cache_size: int = 4, prefill_ms_per_kchar: float = 0.0, token_delay_ms: float = 0.0):
+        super().__init__(prefix_cache_size)
+        self.prefill_ms_per_kchar = prefill_ms_per_kchar
+        self.token_delay_ms = token_delay_ms
+
+    def prefill(self, prefix: str) -> int:
+        if self.prefill_ms_per_kchar:
+            time.sleep(self.prefill_ms_per_kchar * len(prefix) / 1_000_000)
+        return len(prefix)
+
+    def answer(self, suffix: str) -> str:
+        """The full answer generate() streams for a suffix"""
+        products = _PRODUCT_LINE.findall(suffix)
+        if not products:
+            return "I couldn't find products for that request. Could you tell me more about what you need?"
+        name, brand, price, details = products[0]
+        answer = f"I'd recommend {name} by {brand} at ${price}{details.rstrip('.')}."
+        if len(products) > 1:
+            others = [f"{name} by {brand} (${price})" for name, brand, price, _ in products[1:]]
+            answer += f" You could also consider {', '.join(others[:-1])}"
+            answer += f" or {others[-1]}." if len(others) > 1 else f"{others[-1]}."
+        return answer
+
+    def generate(self, state: int, suffix: str, max_tokens: int) -> Iterator[str]:
+        for token in _TOKEN.findall(self.answer(suffix))[:max_tokens]:
+            if self.token_delay_ms:
+                time.sleep(self.token_delay_ms / 1000)
+            yield token
+
+
+class LlamaCppGenerator(AnswerGenerator):
+    """Local Llama model through llama-cpp-python (an optional dependency, imported on first use).
+
+    The cached prefix state is the model's saved KV cache after the prefix tokens.
+    The model evaluates one prompt at a time, so generations are serialized; each
+    runs on its own thread, independent of how fast its tokens are read.
+    """
+
+    name = 'llama_cpp'
+
+    def __init__(
+        self,
+        model_path: str,
+        prefix_cache_size: int = 4,
+        n_ctx: int = 2048,
+        temperature: float = 0.7,
+        top_p: float = 0.9
+    ):
+        super().__init__(prefix_cache_size)
+        from llama_cpp import Llama
+        self.model = Llama(model_path=model_path, n_ctx=n_ctx, verbose=False)
+        self.temperature = temperature
+        self.top_p = top_p
+        self._model_lock = threading.Lock()
+
+    def _tokenize(self, text: str, bos: bool) -> List[int]:
+        return self.model.tokenize(text.encode('utf-8'), add_bos=bos)
+
+    def prefill(self, prefix: str):
+        tokens = self._tokenize(prefix, bos=True)
+        with self._model_lock:
+            self.model.reset()
+            self.model.eval(tokens)
+            return tokens, self.model.save_state()
+
+    def generate(self, state, suffix: str, max_tokens: int) -> Iterator[str]:
+        # Tokens are produced on a thread of their own that holds the model only while generating.
+        # The queue can take the whole answer, so a slow reader never keeps the model from other
+        # requests; closing this generator (a client that went away) stops the producer.
+        tokens: Queue = Queue(maxsize=max_tokens + 2)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(state, suffix, max_tokens, tokens, stop), name='llama-generate', daemon=True
+        )
+        producer.start()
+        try:
+            while True:
+                item = tokens.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def _produce(self, state, suffix: str, max_tokens: int, tokens: Queue, stop: threading.Event):
+        """Generate into the queue under the model lock, then put _END (or the error raised)"""
+        prefix_tokens, saved = state
+        try:
+            prompt = prefix_tokens + self._tokenize(suffix, bos=False)
+            with self._model_lock:
+                self.model.load_state(saved)
+                # generate() finds the loaded prefix tokens and evaluates only the suffix
+                pending = b''
+                for n, token in enumerate(self.model.generate(prompt, temp=self.temperature, top_p=self.top_p)):
+                    if stop.is_set() or token == self.model.token_eos() or n >= max_tokens:
+                        break
+                    pending += self.model.detokenize([token])
+                    try:
+                        text = pending.decode('utf-8')
+                    except UnicodeDecodeError:
+                        continue  # a multi-byte character split across tokens
+                    pending = b''
+                    tokens.put_nowait(text)
+            tokens.put_nowait(_END)
+        except BaseException as e:
+            tokens.put_nowait(e)
+
+
+def create_generator(kind: str = 'stub', **kwargs) -> AnswerGenerator:
+    """Build the answer generator named by kind ('stub' or 'llama_cpp')"""
+    if kind == 'stub':
+        return StubGenerator(**kwargs)
+    if kind == 'llama_cpp':
+        return LlamaCppGenerator(**kwargs)
+    raise ValueError(f"Unknown answer generator: {kind}")
+
+
+def load_generator() -> AnswerGenerator:
+    """The answer generator selected by ANSWER_GENERATOR"""
+    from config import (
+        ANSWER_GENERATOR, MODEL_CONFIG, PROMPT_PREFIX_CACHE_SIZE, STUB_PREFILL_MS_PER_KCHAR, STUB_TOKEN_DELAY_MS
+    )
+    if ANSWER_GENERATOR == 'llama_cpp':
+        return create_generator(
+            'llama_cpp',
+            model_path=MODEL_CONFIG['model_path'],
+            prefix_cache_size=PROMPT_PREFIX_CACHE_SIZE,
+            n_ctx=MODEL_CONFIG['n_ctx'],
+            temperature=MODEL_CONFIG['temperature'],
+            top_p=MODEL_CONFIG['top_p']
+        )
+    return create_generator(
+        ANSWER_GENERATOR,
+        prefix_cache_size=PROMPT_PREFIX_CACHE_SIZE,
+        prefill_ms_per_kchar=STUB_PREFILL_MS_PER_KCHAR,
+        token_delay_ms=STUB_TOKEN_DELAY_MS
+    )
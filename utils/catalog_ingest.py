@@ -0,0 +1,130 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.catalog_preprocessor import SOURCE_COLUMNS, preprocess_catalog, product_texts, source_hashes
+from utils.catalog_state import CatalogState
+from utils.ingredient_analyzer import IngredientAnalyzer
+from utils.text_column import TextColumnWriter
+
+# Analyzer of the current pool process, set by the pool initializer
+_worker_analyzer: Optional[IngredientAnalyzer] = None
+
+
+def _init_worker(analyzer: IngredientAnalyzer):
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _preprocess_in_worker(chunk: pd.DataFrame) -> pd.DataFrame:
+    return preprocess_catalog(chunk, _worker_analyzer)
+
+
+def read_catalog_chunks(data_path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Raw CSV rows, chunk_rows at a time.
+
+    Source columns are read as text so every chunk sees the same values (and
+    source hashes) whatever types the other rows would have inferred.
+    """
+    columns = pd.read_csv(data_path, nrows=0).columns
+    dtypes = {column: str for column in SOURCE_COLUMNS if column in columns}
+    for chunk in pd.read_csv(data_path, chunksize=chunk_rows, dtype=dtypes):
+        yield chunk.reset_index(drop=True)
+
+
+def preprocess_chunks(
+    chunks: Iterator[pd.DataFrame],
+    analyzer: IngredientAnalyzer,
+    n_jobs: int = 1
+) -> Iterator[pd.DataFrame]:
+    """Preprocessed chunks in input order, parsed on a process pool with at most 2 * n_jobs chunks in flight.
+
+    Empty chunks are passed through as they are.
+    """
+    chunks = iter(chunks)
+    head = list(islice(chunks, 2))
+    if n_jobs <= 1 or len(head) < 2:
+        # A single chunk is not worth starting a pool for
+        for chunk in chain(head, chunks):
+            yield chunk if chunk.empty else preprocess_catalog(chunk, analyzer)
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(analyzer,)) as pool:
+        for chunk in chain(head, chunks):
+            if chunk.empty:
+                done = Future()
+                done.set_result(chunk)
+                pending.append(done)
+            else:
+                pending.append(pool.submit(_preprocess_in_worker, chunk))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def ingest_catalog(
+    data_path: str,
+    analyzer: IngredientAnalyzer,
+    descriptions: TextColumnWriter,
+    n_jobs: int = 1,
+    chunk_rows: int = 50_000,
+    reuse: Optional[CatalogState] = None,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+    """Stream a catalog CSV into preprocessed chunks and their embedding texts, in file order.
+
+    HTML parsing and ingredient analysis run on a process pool. Descriptions go
+    to the writer instead of the yielded frames. Rows whose raw values are
+    unchanged from `reuse` keep their preprocessed form and are not sent to the
+    pool. stats receives the number of rows read and reprocessed.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(rows=0, reprocessed=0)
+
+    current_hashes = order = None
+    if reuse is not None and len(reuse):
+        current_hashes = reuse.df['source_hash'].to_numpy()
+        order = np.argsort(current_hashes, kind='stable')
+        current_hashes = current_hashes[order]
+
+    # (raw rows found in reuse, their rows in reuse) per chunk, consumed in the same order
+    plans = deque()
+
+    def changed_rows() -> Iterator[pd.DataFrame]:
+        for raw in read_catalog_chunks(data_path, chunk_rows):
+            found = np.zeros(len(raw), dtype=bool)
+            reused_rows = np.empty(0, dtype=np.intp)
+            if current_hashes is not None:
+                hashes = source_hashes(raw)
+                positions = np.minimum(np.searchsorted(current_hashes, hashes), len(current_hashes) - 1)
+                found = current_hashes[positions] == hashes
+                reused_rows = order[positions[found]]
+            plans.append((found, reused_rows))
+            stats['rows'] += len(raw)
+            stats['reprocessed'] += int((~found).sum())
+            yield raw[~found].reset_index(drop=True)
+
+    for fresh in preprocess_chunks(changed_rows(), analyzer, n_jobs):
+        found, reused_rows = plans.popleft()
+        if len(reused_rows):
+            reused = reuse.df.iloc[reused_rows].assign(
+                description=[reuse.descriptions[row] for row in reused_rows]
+            )
+        if fresh.empty:
+            # Nothing changed; concat with the empty raw frame would turn numeric columns to object
+            chunk = reused.reset_index(drop=True)
+        elif len(reused_rows):
+            # Back into the CSV's row order
+            source_rows = np.concatenate([np.flatnonzero(found), np.flatnonzero(~found)])
+            chunk = pd.concat([reused, fresh], ignore_index=True)
+            chunk = chunk.iloc[np.argsort(source_rows, kind='stable')].reset_index(drop=True)
+        else:
+            chunk = fresh
+        texts = product_texts(chunk)
+        descriptions.extend(chunk.pop('description'))
+        yield chunk, texts
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+from bs4 import BeautifulSoup
+from utils.ingredient_analyzer import IngredientAnalyzer
+
+# Raw CSV columns whose values determine a row's preprocessed form and embedding
+SOURCE_COLUMNS = ['pid', 'name', 'brand', 'price', 'Category', 'description', 'rating', 'reviews', 'ingredients']
+
+
+def source_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Per-row hash of the raw source columns, for spotting rows that changed between catalog versions"""
+    columns = [c for c in SOURCE_COLUMNS if c in df.columns]
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+
+
+def product_texts(df: pd.DataFrame, descriptions: Optional[Sequence[str]] = None) -> List[str]:
+    """Text each product's embedding is computed from; descriptions default to the frame's column"""
+    if df.empty:
+        return []
+    join = lambda values: ' '.join(values) if isinstance(values, list) else ''
+    description = df['description'] if descriptions is None else pd.Series(list(descriptions), index=df.index)
+    texts = (
+        df['name'].astype(str) + ' ' + df['brand'].astype(str) + ' ' + description.astype(str) + ' '
+        + df['skin_type'].map(join) + ' ' + df['skincare_concerns'].map(join)
+    )
+    return texts.tolist()
+
+
+def extract_from_description(description: str) -> Dict:
+    """Extract structured information from HTML description"""
+    if not isinstance(description, str):
+        return {'skin_type': [], 'skincare_concerns': [], 'formulation': ''}
+
+    try:
+        soup = BeautifulSoup(description, 'html.parser')
+        text = soup.get_text()
+
+        extracted = {
+            'skin_type': [],
+            'skincare_concerns': [],
+            'formulation': ''
+        }
+
+        # Extract skin type
+        if 'Skin Type:' in text:
+            skin_type_text = text.split('Skin Type:')[1].split('<br>')[0].strip()
+            extracted['skin_type'] = [t.strip() for t in skin_type_text.split(',')]
+
+        # Extract skincare concerns
+        if 'Skincare Concerns:' in text:
+            concerns_text = text.split('Skincare Concerns:')[1].split('<br>')[0].strip()
+            extracted['skincare_concerns'] = [c.strip() for c in concerns_text.split(',')]
+
+        # Extract formulation
+        if 'Formulation:' in text:
+            formulation_text = text.split('Formulation:')[1].split('<br>')[0].strip()
+            extracted['formulation'] = formulation_text
+
+        return extracted
+
+    except Exception as e:
+        print(f"Error extracting from description: {str(e)}")
+        return {'skin_type': [], 'skincare_concerns': [], 'formulation': ''}
+
+
+def preprocess_catalog(df: pd.DataFrame, ingredient_analyzer: IngredientAnalyzer) -> pd.DataFrame:
+    """Preprocess the raw Sephora data"""
+    df['source_hash'] = source_hashes(df)
+
+    # Handle missing values
+    df['description'] = df['description'].fillna('')
+    df['ingredients'] = df['ingredients'].fillna('')
+    df['brand'] = df['brand'].fillna('')
+    df['name'] = df['name'].fillna('')
+    df['Category'] = df['Category'].fillna('')
+
+    # Clean price - remove currency symbol and convert to float
+    if 'price' in df.columns:
+        df['price'] = df['price'].apply(lambda x:
+            float(str(x).replace('$', '').replace(',', '')) if pd.notnull(x) else 0.0
+        )
+
+    # Clean ratings
+    if 'rating' in df.columns:
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0.0)
+    if 'reviews' in df.columns:
+        df['reviews'] = pd.to_numeric(df['reviews'], errors='coerce').fillna(0)
+
+    # Extract structured data from description
+    descriptions = df['description'].apply(extract_from_description)
+
+    # Add extracted columns with proper handling
+    df['skin_type'] = descriptions.apply(lambda x: x.get('skin_type', []))
+    df['skincare_concerns'] = descriptions.apply(lambda x: x.get('skincare_concerns', []))
+    df['formulation'] = descriptions.apply(lambda x: x.get('formulation', ''))
+
+    # Analyze ingredients
+    print("Analyzing ingredients...")
+    df['ingredient_analysis'] = pd.Series(
+        ingredient_analyzer.analyze_many(df['ingredients']),
+        index=df.index,
+        dtype=object
+    )
+    print("Finished analyzing ingredients")
+    return df
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from models.pydantic_models import IngredientAnalysis
+from utils.file_lock import file_lock
+from utils.ingredient_analyzer import IngredientAnalyzer
+from utils.text_column import TextColumn, TextColumnWriter
+
+# Bump whenever preprocess_catalog changes the columns it produces
+SNAPSHOT_FORMAT_VERSION = 4
+
+# Lock file in the cache directory, held exclusively while snapshots are written and shared while read
+BUILD_LOCK_NAME = 'build.lock'
+
+
+def _column_kind(name: str, values: pd.Series) -> str:
+    """How a column is stored: 'array' (.npy), 'text' (TextColumn), 'analysis' or 'json' (JSON per row)"""
+    if name == 'ingredient_analysis':
+        return 'analysis'
+    if values.dtype.kind in 'biuf':
+        return 'array'
+    if all(isinstance(v, str) for v in values):
+        return 'text'
+    return 'json'
+
+
+def _json_default(value):
+    # NumPy scalars that ended up in object columns
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _encode_json(value) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+
+def _encode_analysis(analysis: Optional[IngredientAnalysis]) -> str:
+    return _encode_json(analysis.dict() if analysis is not None else None)
+
+
+def _decode_analysis(text: str) -> Optional[IngredientAnalysis]:
+    fields = json.loads(text)
+    return IngredientAnalysis.construct(**fields) if fields is not None else None
+
+
+class CatalogSnapshot:
+    """Preprocessed catalog persisted to disk, invalidated by source data and analyzer rules.
+
+    Each column is its own file: numeric columns as .npy arrays, strings as
+    TextColumns and list or analysis values as one JSON document per row. A
+    manifest, written last, names the columns. Nothing is unpickled on load,
+    so a snapshot can only ever yield data.
+    """
+
+    def __init__(self, cache_dir: str, data_path: str, ingredient_analyzer: IngredientAnalyzer):
+        self.data_path = data_path
+        self.ingredient_analyzer = ingredient_analyzer
+        self.path = Path(cache_dir) / 'catalog'
+        self._fingerprint: Optional[str] = None
+
+    def fingerprint(self) -> str:
+        """Hash of the source CSV, the analyzer rule tables and the snapshot format (computed once)"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(f"v{SNAPSHOT_FORMAT_VERSION}".encode('ascii'))
+            digest.update(self.ingredient_analyzer.rules_fingerprint().encode('ascii'))
+            with open(self.data_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            self._fingerprint = digest.hexdigest()[:32]
+        return self._fingerprint
+
+    def _snapshot_file(self, fingerprint: str) -> Path:
+        return self.path / f"catalog-{fingerprint}.json"
+
+    def _column_prefix(self, fingerprint: str, position: int) -> str:
+        return str(self.path / f"catalog-{fingerprint}.column{position}")
+
+    def _descriptions_prefix(self, fingerprint: str) -> str:
+        return str(self.path / f"catalog-{fingerprint}.descriptions")
+
+    def load(self) -> Optional[Tuple[pd.DataFrame, TextColumn]]:
+        """Return the preprocessed catalog and its descriptions if a snapshot matching the current inputs exists"""
+        fingerprint = self.fingerprint()
+        snapshot_file = self._snapshot_file(fingerprint)
+        if not snapshot_file.exists():
+            return None
+        try:
+            df = self._load_columns(fingerprint, snapshot_file)
+            descriptions = TextColumn.load(self._descriptions_prefix(fingerprint))
+        except Exception as e:
+            print(f"Ignoring unreadable catalog snapshot: {str(e)}")
+            return None
+        if len(descriptions) != len(df):
+            print("Ignoring catalog snapshot with mismatched descriptions")
+            return None
+        return df, descriptions
+
+    def _load_columns(self, fingerprint: str, snapshot_file: Path) -> pd.DataFrame:
+        with open(snapshot_file) as f:
+            manifest = json.load(f)
+        data: Dict[str, object] = {}
+        for position, column in enumerate(manifest['columns']):
+            prefix = self._column_prefix(fingerprint, position)
+            kind = column['kind']
+            if kind == 'array':
+                data[column['name']] = np.load(f"{prefix}.npy")
+            elif kind == 'text':
+                data[column['name']] = TextColumn.load(prefix).tolist()
+            elif kind == 'analysis':
+                data[column['name']] = [_decode_analysis(v) for v in TextColumn.load(prefix).tolist()]
+            elif kind == 'json':
+                data[column['name']] = [json.loads(v) for v in TextColumn.load(prefix).tolist()]
+            else:
+                raise ValueError(f"Unknown snapshot column kind: {kind}")
+        df = pd.DataFrame(data, columns=[column['name'] for column in manifest['columns']])
+        if len(df) != manifest['rows']:
+            raise ValueError(f"Snapshot has {len(df)} rows, manifest says {manifest['rows']}")
+        return df
+
+    def _save_columns(self, fingerprint: str, df: pd.DataFrame) -> List[Dict[str, str]]:
+        columns = []
+        for position, name in enumerate(df.columns):
+            prefix = self._column_prefix(fingerprint, position)
+            values = df[name]
+            kind = _column_kind(name, values)
+            if kind == 'array':
+                tmp_file = f"{prefix}.tmp{os.getpid()}.npy"
+                np.save(tmp_file, values.to_numpy())
+                os.replace(tmp_file, f"{prefix}.npy")
+            elif kind == 'text':
+                TextColumn.from_strings(values).save(prefix)
+            else:
+                encode = _encode_analysis if kind == 'analysis' else _encode_json
+                TextColumn.from_strings(encode(v) for v in values).save(prefix)
+            columns.append({'name': str(name), 'kind': kind})
+        return columns
+
+    def descriptions_writer(self) -> TextColumnWriter:
+        """Writer that streams descriptions straight into this snapshot's location"""
+        return TextColumnWriter(self._descriptions_prefix(self.fingerprint()))
+
+    def save(self, df: pd.DataFrame, descriptions: TextColumn) -> Path:
+        """Write the preprocessed catalog and drop snapshots of older inputs.
+
+        Every file is written under a temporary name and renamed into place. The
+        caller holds the build lock, so no other process is loading the files
+        this replaces or prunes.
+        """
+        fingerprint = self.fingerprint()
+        snapshot_file = self._snapshot_file(fingerprint)
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            descriptions.save(self._descriptions_prefix(fingerprint))
+            # The manifest goes last: until it exists the snapshot is not loaded
+            columns = self._save_columns(fingerprint, df)
+            tmp_file = snapshot_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({'rows': len(df), 'columns': columns}, f)
+            os.replace(tmp_file, snapshot_file)
+            for stale in self.path.glob('catalog-*'):
+                if not stale.name.startswith(f"catalog-{fingerprint}."):
+                    stale.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Could not write catalog snapshot: {str(e)}")
+        return snapshot_file
+
+
+def build_snapshot(data_path: str, cache_dir: str, n_jobs: int = 1, chunk_rows: int = 50_000) -> Path:
+    """Preprocess the CSV at data_path chunk by chunk and write its snapshot"""
+    from utils.catalog_ingest import ingest_catalog
+
+    analyzer = IngredientAnalyzer()
+    snapshot = CatalogSnapshot(cache_dir, data_path, analyzer)
+    with file_lock(Path(cache_dir) / BUILD_LOCK_NAME):
+        writer = snapshot.descriptions_writer()
+        frames = [chunk for chunk, _ in ingest_catalog(data_path, analyzer, writer, n_jobs, chunk_rows)]
+        df = pd.concat(frames, ignore_index=True)
+        return snapshot.save(df, writer.close())
+
+
+if __name__ == "__main__":
+    from config import DATA_PATH, CACHE_DIR, INGEST_WORKERS, INGEST_CHUNK_ROWS
+
+    path = build_snapshot(
+        sys.argv[1] if len(sys.argv) > 1 else DATA_PATH, CACHE_DIR, INGEST_WORKERS, INGEST_CHUNK_ROWS
+    )
+    print(f"Wrote catalog snapshot to {path}")
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+from utils.facet_index import FacetIndex
+from utils.ingredient_analyzer import IngredientAnalyzer
+from utils.ingredient_index import IngredientIndex
+from utils.metrics import Gauge, startup_phase
+from utils.minhash_index import MinHashIndex
+from utils.product_cache import ProductCache
+from utils.quantized_embeddings import QuantizedEmbeddings
+from utils.text_column import TextColumn
+from utils.vector_index import VectorIndex, create_vector_index
+from config import (
+    VECTOR_INDEX, IVF_N_LISTS, IVF_N_PROBE, MINHASH_PERMUTATIONS, MINHASH_BANDS,
+    EMBEDDING_PRECISION, RESCORE_FACTOR
+)
+
+
+class CatalogState:
+    """One catalog version: the preprocessed frame, its descriptions, embeddings and every index built from them.
+
+    A state is never modified after construction. Updates build a new state and
+    swap it in, so a reader holding a state sees a consistent catalog throughout.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        descriptions: TextColumn,
+        product_embeddings: np.ndarray,
+        ingredient_analyzer: IngredientAnalyzer,
+        version: int = 1,
+        timings: Optional[Dict[str, float]] = None,
+        phase_gauge: Optional[Gauge] = None
+    ):
+        """timings receives each index's build time; phase_gauge defaults to the startup gauge"""
+        if len(df) != product_embeddings.shape[0]:
+            raise ValueError(f"{len(df)} products but {product_embeddings.shape[0]} embeddings")
+        if len(df) != len(descriptions):
+            raise ValueError(f"{len(df)} products but {len(descriptions)} descriptions")
+        self.version = version
+        self.df = df
+        self.descriptions = descriptions  # kept out of df; memory-mapped when loaded from a snapshot
+        self.product_embeddings = product_embeddings
+
+        with startup_phase('ingredient_index', timings, phase_gauge):
+            self.ingredient_index = IngredientIndex.from_analyses(
+                df['ingredient_analysis'],
+                families=ingredient_analyzer.potentially_harmful
+            )
+        with startup_phase('dupe_index', timings, phase_gauge):
+            self.dupe_index = MinHashIndex(
+                self.ingredient_index.row_ingredients,
+                self.ingredient_index.row_offsets,
+                n_permutations=MINHASH_PERMUTATIONS,
+                n_bands=MINHASH_BANDS
+            )
+        with startup_phase('facet_index', timings, phase_gauge):
+            self.facet_index = FacetIndex(df)
+        with startup_phase('product_cache', timings, phase_gauge):
+            self.product_cache = ProductCache(df, descriptions)
+            self._build_pid_index()
+        with startup_phase('vector_index', timings, phase_gauge):
+            self.vector_index = self._build_vector_index()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def _build_pid_index(self):
+        """Map lower-cased product ids and names to rows (chat messages are lower-cased before parsing)"""
+        self.pid_rows = {pid.lower(): row for row, pid in enumerate(self.product_cache.columns['pid'])}
+        self.name_rows: Dict[str, int] = {}
+        for row, name in enumerate(self.product_cache.columns['name']):
+            self.name_rows.setdefault(str(name).strip().lower(), row)
+
+    def _build_vector_index(self) -> VectorIndex:
+        """Build the nearest-neighbour index over the product embeddings"""
+        kwargs = {'n_lists': IVF_N_LISTS, 'n_probe': IVF_N_PROBE} if VECTOR_INDEX == 'ivf' else {}
+        if EMBEDDING_PRECISION != 'float32':
+            # Scans read the compact copy; the float32 matrix is touched only for rescoring
+            kwargs['quantized'] = QuantizedEmbeddings(self.product_embeddings, EMBEDDING_PRECISION)
+            kwargs['rescore_factor'] = RESCORE_FACTOR
+        return create_vector_index(self.product_embeddings, VECTOR_INDEX, **kwargs)
+
+    def row_for_product(self, reference: str) -> int:
+        """Row of a product given by id or exact name; raises KeyError if unknown"""
+        key = str(reference).strip().lower()
+        row = self.pid_rows.get(key, self.name_rows.get(key))
+        if row is None:
+            raise KeyError(reference)
+        return row
+
+    def rows_for_pids(self, pids: Sequence[str]) -> List[int]:
+        """Rows of the given product ids; raises KeyError for the first unknown one"""
+        rows = []
+        for pid in pids:
+            row = self.pid_rows.get(str(pid).strip().lower())
+            if row is None:
+                raise KeyError(pid)
+            rows.append(row)
+        return rows
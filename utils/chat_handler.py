@@ -1,5 +1,10 @@
+import copy
+import json
 import re
-from typing import List, Optional, Dict
+import time
+import uuid
+from typing import Iterator, List, Optional, Dict, Tuple
+import numpy as np
 from models.pydantic_models import (
     ChatMessage,
     ChatRequest,
@@ -7,11 +12,54 @@ from models.pydantic_models import (
     ProductComparison,
     SephoraProduct
 )
+from utils.answer_generator import AnswerGenerator, StubGenerator, PROMPT_PREFIX_TEMPLATE, PROMPT_SUFFIX_END
 from utils.product_recommender import ProductRecommender
+from utils.metrics import (
+    GENERATION_SECONDS, TTFT_SECONDS, RequestTrace, configure_slow_request_log, stage, trace_request
+)
+from utils.session_store import Session, SessionStore
+from config import (
+    MODEL_CONFIG, SLOW_REQUEST_MS, SLOW_REQUEST_LOG, SESSION_MAX_COUNT, SESSION_TTL_SECONDS, SESSION_MAX_RANKED
+)
+
+# Follow-ups to the conversation's previous search (matched against the lower-cased message)
+MORE_PATTERN = re.compile(
+    r'^\s*(?:please\s+)?(?:(?:show|give|get)\s+(?:me\s+)?)?(?:some\s+|any\s+)?'
+    r'(?:more|next|other|others)(?:\s+(?:ones|options|products|results|page))?(?:\s+please)?[\s.!?]*$'
+)
+# A refinement is made only of price/skin-type cues and filler words, optionally ending in an
+# exclusion ("cheaper ones", "only under $30", "for oily skin without fragrance"); anything
+# else ("those serums for oily skin") is a new search
+_REFINE_CUE = (
+    r'(?:cheaper|less\s+expensive|under\s*\$\d+(?:\.\d+)?'
+    r'|for\s+(?:dry|oily|combination|sensitive|normal)(?:\s+skin)?)'
+)
+_REFINE_FILLER = (
+    r'(?:and|but|also|what\s+about|how\s+about|only|just|(?:show|give)\s+me|any|some|the'
+    r'|ones|options|products|those|these|them|please)'
+)
+_EXCLUSION = r'(?:without|no|avoid|exclude)\s+[\w\s,-]+'
+REFINE_PATTERN = re.compile(
+    rf'^[\s,]*(?:{_REFINE_FILLER}\b[\s,]*)*'
+    rf'(?:{_REFINE_CUE}\b[\s,]*(?:(?:{_REFINE_FILLER}|{_REFINE_CUE})\b[\s,]*)*(?:{_EXCLUSION})?|{_EXCLUSION})'
+    r'[.!?]*\s*$'
+)
+CHEAPER_PATTERN = re.compile(r'\b(?:cheaper|less expensive)\b')
+
+# Earlier messages of the conversation included in a generation prompt
+PROMPT_HISTORY_MESSAGES = 6
 
 class ChatHandler:
-    def __init__(self, recommender: ProductRecommender):
+    def __init__(
+        self,
+        recommender: ProductRecommender,
+        sessions: Optional[SessionStore] = None,
+        generator: Optional[AnswerGenerator] = None
+    ):
         self.recommender = recommender
+        self.sessions = sessions or SessionStore(SESSION_MAX_COUNT, SESSION_TTL_SECONDS)
+        self.generator = generator or StubGenerator()
+        self._prompt_prefix: Tuple[int, str] = (0, '')  # (catalog version, prefix)
     
     def _extract_filters(self, message: str) -> Dict:
         """Extract filters from user message"""
@@ -78,6 +126,16 @@ class ChatHandler:
         
         return response
     
+    def _format_more_response(self, products: List[SephoraProduct]) -> str:
+        """Format a further page of the previous recommendations"""
+        if not products:
+            return "That's all the products matching your criteria."
+        
+        response = "Here are more options:"
+        for product in products:
+            response += f"\n- {product.name} by {product.brand} (${product.price:.2f})"
+        return response
+    
     def _format_comparison_response(self, comparison: ProductComparison) -> str:
         """Format the product comparison response"""
         response = "Here's how these products compare:\n\n"
@@ -103,29 +161,369 @@ class ChatHandler:
         
         return response
 
-    def handle_chat(self, request: ChatRequest) -> ChatResponse:
-        """Handle incoming chat requests"""
+    def _format_dupes_response(
+        self,
+        original: str,
+        products: List[SephoraProduct],
+        overlaps: List[float]
+    ) -> str:
+        """Format the similar-formula (dupe) response"""
+        if not products:
+            return f"I couldn't find any products with a formula similar to {original}."
+        
+        response = f"These products have formulas similar to {original}:"
+        for product, overlap in zip(products, overlaps):
+            response += f"\n- {product.name} by {product.brand} (${product.price:.2f}), "
+            response += f"{overlap*100:.0f}% ingredient overlap"
+        return response
+
+    def _handle(
+        self,
+        request: ChatRequest,
+        recommender: ProductRecommender
+    ) -> Tuple[str, Optional[np.ndarray], Optional[List[SephoraProduct]], Dict]:
+        """Response text, recommended rows and products, and the remaining response fields.
+
+        recommender is pinned to one catalog version for the whole request.
+        """
         current_message = request.messages[-1].content
         
         # Check for comparison request
         comparison_match = re.search(r'compare\s+(\w+)\s+and\s+(\w+)', current_message.lower())
         if comparison_match:
             product1_id, product2_id = comparison_match.groups()
-            comparison = self.recommender.compare_products(product1_id, product2_id)
-            response = self._format_comparison_response(comparison)
-            return ChatResponse(response=response, comparison=comparison)
+            try:
+                comparison = recommender.compare_products(product1_id, product2_id)
+            except KeyError as e:
+                return f"I couldn't find a product with id {e.args[0]}.", None, None, {}
+            with stage('format_response'):
+                response = self._format_comparison_response(comparison)
+            return response, None, None, {'comparison': comparison}
+        
+        # Check for dupe request: "dupes for <product id or name>"
+        dupe_match = re.search(r'\bdupes?\s+(?:for|of)\s+(.+?)[\s?.!]*$', current_message.lower())
+        if dupe_match:
+            reference = dupe_match.group(1)
+            try:
+                row = recommender.row_for_product(reference)
+                top_indices, overlaps = recommender.find_dupe_indices(reference)
+            except KeyError:
+                return f"I couldn't find a product called {reference}.", None, None, {}
+            with stage('product_models'):
+                products = recommender.product_cache.products(top_indices)
+            original = recommender.product_cache.columns['name'][row]
+            with stage('format_response'):
+                response = self._format_dupes_response(original, products, overlaps.tolist())
+            return response, top_indices, products, {}
+        
+        # Follow-ups page through or narrow the conversation's previous results
+        message = current_message.lower()
+        session = self.sessions.get(request.conversation_id) if request.conversation_id else None
+        if session is not None and session.version != recommender.catalog_version:
+            # The catalog changed since: rank again from the stored query, keeping the reader's place
+            session = self._ranked_session(
+                session.conversation_id, recommender, session.query_embedding, session.filters,
+                session.excluded_ingredients, session.ranking, min_rows=session.offset,
+                page_start=session.page_start, offset=session.offset
+            )
+        
+        if request.cursor is not None:
+            offset = session.parse_cursor(request.cursor) if session is not None else None
+            if offset is None:
+                return "Those results have expired. What would you like to search for?", None, None, {}
+            return self._page(session, recommender, offset, request.n_results)
+        if MORE_PATTERN.match(message):
+            if session is None:
+                return "I don't have an earlier search to continue. What are you looking for?", None, None, {}
+            return self._page(session, recommender, session.offset, request.n_results)
+        if session is not None and REFINE_PATTERN.match(message):
+            return self._narrow(session, recommender, request, message)
         
         # Extract filters and exclusions
-        filters = request.filters or self._extract_filters(current_message)
-        excluded_ingredients = request.excluded_ingredients or self._extract_ingredient_exclusions(current_message)
-        
-        # Get recommendations
-        recommended_products = self.recommender.find_similar_products(
-            query=current_message,
-            filters=filters,
-            excluded_ingredients=excluded_ingredients
+        with stage('parse_message'):
+            filters = request.filters or self._extract_filters(current_message)
+            excluded_ingredients = request.excluded_ingredients or self._extract_ingredient_exclusions(current_message)
+        
+        # Rank the best candidates once; later pages and refinements reuse them
+        session = self._ranked_session(
+            request.conversation_id or (uuid.uuid4().hex if self.sessions.enabled else None), recommender,
+            recommender.encode_query(current_message), filters, excluded_ingredients,
+            ranking=session.ranking + 1 if session is not None else 1, min_rows=request.n_results
         )
+        return self._page(session, recommender, 0, request.n_results)
+
+    def _ranked_session(
+        self,
+        conversation_id: str,
+        recommender: ProductRecommender,
+        query_embedding: np.ndarray,
+        filters: Dict,
+        excluded_ingredients: List[str],
+        ranking: int,
+        min_rows: int = 0,
+        **position
+    ) -> Session:
+        """Session holding the best candidates for an encoded query, with their result and facet counts"""
+        limit = max(SESSION_MAX_RANKED if self.sessions.enabled else 0, min_rows)
+        mask = recommender.candidate_mask(filters, excluded_ingredients)
+        rows = recommender.rank(query_embedding, n_results=limit, mask=mask)
+        total_results, facets = recommender.facet_counts(mask=mask)
+        return Session(
+            conversation_id, recommender.catalog_version, query_embedding, filters, excluded_ingredients,
+            rows, len(rows) < limit or len(rows) >= total_results, total_results, facets, ranking, **position
+        )
+
+    def _narrow(
+        self,
+        session: Session,
+        recommender: ProductRecommender,
+        request: ChatRequest,
+        message: str
+    ) -> Tuple[str, Optional[np.ndarray], Optional[List[SephoraProduct]], Dict]:
+        """Apply a follow-up's filters and exclusions on top of the session's, then show the first page"""
+        with stage('parse_message'):
+            new_filters = request.filters or self._extract_filters(message)
+            new_excluded = request.excluded_ingredients or self._extract_ingredient_exclusions(message)
+        filters = {**session.filters, **new_filters}
+        excluded_ingredients = list(dict.fromkeys(session.excluded_ingredients + new_excluded))
+        
+        if CHEAPER_PATTERN.search(message):
+            shown = session.rows[session.page_start:session.offset]
+            if len(shown):
+                prices = recommender.product_cache.columns['price']
+                ceiling = float(np.nextafter(min(prices[row] for row in shown), 0))
+                low, high = filters.get('price_range', [0, ceiling])
+                filters['price_range'] = [low, min(high, ceiling)]
         
-        # Format and return response
-        response = self._format_product_response(recommended_products, excluded_ingredients)
-        return ChatResponse(response=response, products=recommended_products)
\ No newline at end of file
+        # Changing a filter's value can admit products the cached list never held;
+        # added filters and exclusions only remove, so the cached order still holds
+        if any(key in session.filters and session.filters[key] != value for key, value in new_filters.items()):
+            narrowed = self._ranked_session(
+                session.conversation_id, recommender, session.query_embedding, filters,
+                excluded_ingredients, session.ranking + 1, min_rows=request.n_results
+            )
+        else:
+            mask = recommender.candidate_mask(filters, excluded_ingredients)
+            rows = recommender.narrow(session.rows, mask=mask)
+            total_results, facets = recommender.facet_counts(mask=mask)
+            narrowed = Session(
+                session.conversation_id, session.version, session.query_embedding, filters,
+                excluded_ingredients, rows, session.complete or len(rows) >= total_results,
+                total_results, facets, session.ranking + 1
+            )
+        return self._page(narrowed, recommender, 0, request.n_results)
+
+    def _page(
+        self,
+        session: Session,
+        recommender: ProductRecommender,
+        offset: int,
+        n_results: int
+    ) -> Tuple[str, Optional[np.ndarray], Optional[List[SephoraProduct]], Dict]:
+        """Show n_results of the session's candidates from offset and remember the position"""
+        if offset + n_results > len(session.rows) and not session.complete:
+            # Past the cached candidates: rank deeper from the stored query embedding
+            session = self._ranked_session(
+                session.conversation_id, recommender, session.query_embedding, session.filters,
+                session.excluded_ingredients, session.ranking, min_rows=offset + n_results
+            )
+        page = session.rows[offset:offset + n_results]
+        session = copy.copy(session)
+        session.page_start, session.offset = offset, offset + len(page)
+        self.sessions.put(session)
+        
+        with stage('product_models'):
+            products = recommender.product_cache.products(page)
+        with stage('format_response'):
+            if offset == 0:
+                response = self._format_product_response(products, session.excluded_ingredients)
+            else:
+                response = self._format_more_response(products)
+        return response, page, products, {
+            'total_results': session.total_results,
+            'facets': session.facets,
+            'conversation_id': session.conversation_id,
+            # Without sessions there is nothing for a cursor to point into
+            'next_cursor': session.cursor() if self.sessions.enabled else None,
+            'excluded_ingredients': session.excluded_ingredients
+        }
+
+    def _prompt_prefix_for(self, recommender: ProductRecommender) -> str:
+        """System prompt with an overview of the catalog; identical for every request on a catalog version"""
+        version, prefix = self._prompt_prefix
+        if version == recommender.catalog_version:
+            return prefix
+        columns = recommender.product_cache.columns
+        categories: Dict[str, int] = {}
+        for category in columns['category']:
+            if category:
+                categories[category] = categories.get(category, 0) + 1
+        top_categories = sorted(categories, key=lambda c: -categories[c])[:8]
+        prices = [price for price in columns['price'] if price > 0] or [0.0]
+        system = (
+            f"You are a helpful skincare shopping assistant for a Sephora catalog of {len(columns['pid'])} "
+            f"products from {len(set(columns['brand']))} brands. "
+            f"Main categories: {', '.join(top_categories) or 'none'}. "
+            f"Prices range from ${min(prices):.2f} to ${max(prices):.2f}.\n"
+            "Recommend only products from the numbered list given with each question. Mention the price "
+            "and who the product suits, respect any ingredients the user wants to avoid, and keep the "
+            "answer under 120 words."
+        )
+        prefix = PROMPT_PREFIX_TEMPLATE.format(system=system)
+        self._prompt_prefix = (recommender.catalog_version, prefix)
+        return prefix
+
+    def _prompt_suffix(self, request: ChatRequest, products: List[SephoraProduct], excluded: List[str]) -> str:
+        """Per-request part of the prompt: the retrieved products and the recent conversation"""
+        lines = ["Products:"]
+        for number, product in enumerate(products, 1):
+            line = f"{number}. {product.name} by {product.brand} (${product.price:.2f})"
+            if product.rating:
+                line += f", rated {product.rating}/5"
+            if product.skin_type:
+                line += f", for {', '.join(product.skin_type)} skin"
+            lines.append(line)
+        if excluded:
+            lines.append(f"All of them avoid: {', '.join(excluded)}")
+        lines.append("")
+        for message in request.messages[-PROMPT_HISTORY_MESSAGES:]:
+            lines.append(f"{'User' if message.role == 'user' else 'Assistant'}: {message.content}")
+        return '\n'.join(lines) + PROMPT_SUFFIX_END
+
+    def _response_fields(
+        self,
+        request: ChatRequest,
+        recommender: ProductRecommender,
+        top_indices: Optional[np.ndarray],
+        extra: Dict
+    ) -> List[str]:
+        """ChatResponse JSON members other than response, products built from cached fragments"""
+        if top_indices is not None:
+            products = recommender.product_cache.products_json(top_indices, request.fields)
+        else:
+            products = 'null'
+        comparison = extra.get('comparison')
+        return [
+            '"products":' + products,
+            '"comparison":' + (comparison.json() if comparison is not None else 'null'),
+            '"total_results":' + json.dumps(extra.get('total_results')),
+            '"facets":' + json.dumps(extra.get('facets'), ensure_ascii=False),
+            '"conversation_id":' + json.dumps(extra.get('conversation_id', request.conversation_id)),
+            '"next_cursor":' + json.dumps(extra.get('next_cursor')),
+        ]
+
+    def stream_chat(self, request: ChatRequest) -> Iterator[Tuple[str, str]]:
+        """Handle a chat request whose answer is generated, as (event name, JSON object) pairs.
+
+        Retrieval happens before this returns. The events are 'products' (the
+        ChatResponse fields except response), one 'token' per generated piece of
+        text and 'done' with the full answer and its timings; generation runs as
+        they are consumed, and its prefill and generate stages are part of the
+        request's trace, which ends with the stream. Replies without products
+        (comparisons, nothing found) are sent as a single token.
+        """
+        trace = RequestTrace('chat_stream')
+        try:
+            with trace.active():
+                recommender = self.recommender.pinned()
+                response, top_indices, products, extra = self._handle(request, recommender)
+                prompt = None
+                if products and 'comparison' not in extra:
+                    with stage('build_prompt'):
+                        excluded = extra.get('excluded_ingredients') or []
+                        prompt = (self._prompt_prefix_for(recommender), self._prompt_suffix(request, products, excluded))
+                with stage('serialize'):
+                    head = '{' + ','.join(self._response_fields(request, recommender, top_indices, extra)) + '}'
+        except BaseException:
+            trace.finish()
+            raise
+        return self._stream_events(trace, head, response, prompt)
+
+    def _stream_events(
+        self,
+        trace: RequestTrace,
+        head: str,
+        response: str,
+        prompt: Optional[Tuple[str, str]]
+    ) -> Iterator[Tuple[str, str]]:
+        start = trace.start
+        first_token = None
+        n_tokens = 0
+        prefix_cached = None
+        try:
+            yield 'products', head
+            if prompt is not None:
+                prefix, suffix = prompt
+                with trace.active(), stage('prefill'):
+                    state, prefix_cached = self.generator.prefix_state(prefix)
+                pieces = []
+                tokens = self.generator.generate(state, suffix, MODEL_CONFIG['max_length'])
+                generating = 0.0
+                try:
+                    while True:
+                        # Only time spent producing tokens counts, not time the client takes to read them
+                        started = time.perf_counter()
+                        text = next(tokens, None)
+                        generating += time.perf_counter() - started
+                        if text is None:
+                            break
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                            TTFT_SECONDS.observe(first_token, self.generator.name)
+                        pieces.append(text)
+                        n_tokens += 1
+                        yield 'token', json.dumps({'text': text}, ensure_ascii=False)
+                finally:
+                    # A client that disconnects closes this generator; stop generating for it too
+                    tokens.close()
+                    trace.add('generate', generating)
+                GENERATION_SECONDS.observe(time.perf_counter() - start, self.generator.name)
+                response = ''.join(pieces)
+            else:
+                yield 'token', json.dumps({'text': response}, ensure_ascii=False)
+            yield 'done', json.dumps({
+                'response': response,
+                'generated': prompt is not None,
+                'tokens': n_tokens,
+                'prefix_cached': prefix_cached,
+                'ttft_ms': round(first_token * 1000, 3) if first_token is not None else None,
+                'total_ms': round((time.perf_counter() - start) * 1000, 3),
+            }, ensure_ascii=False)
+        finally:
+            trace.finish()
+
+    def handle_chat(self, request: ChatRequest) -> ChatResponse:
+        """Handle incoming chat requests"""
+        with trace_request('chat'):
+            response, _, products, extra = self._handle(request, self.recommender.pinned())
+            extra.setdefault('conversation_id', request.conversation_id)
+            extra.pop('excluded_ingredients', None)
+            return ChatResponse(response=response, products=products, **extra)
+
+    def handle_chat_json(self, request: ChatRequest) -> str:
+        """Handle a chat request and return ChatResponse JSON built from cached product fragments"""
+        with trace_request('chat'):
+            recommender = self.recommender.pinned()
+            response, top_indices, _, extra = self._handle(request, recommender)
+            with stage('serialize'):
+                parts = ['"response":' + json.dumps(response, ensure_ascii=False)]
+                parts += self._response_fields(request, recommender, top_indices, extra)
+                return '{' + ','.join(parts) + '}'
+
+
+# Per-process handler for the 'process' execution mode
+_worker_handler: Optional[ChatHandler] = None
+
+
+def init_worker(data_path: str):
+    """Process pool initializer: build this worker's recommender and handler.
+
+    Sessions are disabled: a follow-up could land on any pool process.
+    """
+    global _worker_handler
+    configure_slow_request_log(SLOW_REQUEST_MS, SLOW_REQUEST_LOG)
+    _worker_handler = ChatHandler(ProductRecommender(data_path), sessions=SessionStore(0, SESSION_TTL_SECONDS))
+
+
+def handle_chat_in_worker(request: ChatRequest) -> str:
+    return _worker_handler.handle_chat_json(request)
@@ -0,0 +1,189 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
+
+KEY_DTYPE = 'S32'
+
+
+class EmbeddingStore:
+    """On-disk, memory-mapped product embeddings keyed by content hash and model name"""
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.model_name = model_name
+        slug = re.sub(r'[^\w.-]+', '_', model_name)
+        self.path = Path(cache_dir) / 'embeddings' / slug
+        self.keys_path = self.path / 'keys.npy'
+        self.matrix_path = self.path / 'embeddings.npy'
+        self.meta_path = self.path / 'meta.json'
+        # Rows sent to the encoder by this store so far
+        self.encoded_count = 0
+
+    def _tmp_path(self, name: str, suffix: str) -> Path:
+        """Scratch file private to this process, so concurrent builders never share one"""
+        return self.path / f"{name}.tmp{os.getpid()}{suffix}"
+
+    @staticmethod
+    def content_key(text: str) -> bytes:
+        """Stable hash of the text a product embedding is computed from"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest().encode('ascii')
+
+    def load(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Load stored keys and a memory-mapped embedding matrix, if present and valid"""
+        empty = np.empty(0, dtype=KEY_DTYPE)
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta.get('model') != self.model_name:
+                return empty, None
+            keys = np.load(self.keys_path)
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return empty, None
+
+        if matrix.ndim != 2 or len(keys) != matrix.shape[0]:
+            return empty, None
+        return keys, matrix
+
+    def save(self, keys: np.ndarray, matrix: np.ndarray) -> None:
+        """Atomically replace the stored keys and embeddings"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_matrix = self._tmp_path('embeddings', '.npy')
+        np.save(tmp_matrix, np.ascontiguousarray(matrix, dtype=np.float32))
+        self._commit(keys, tmp_matrix, matrix.shape)
+
+    def _commit(self, keys: np.ndarray, tmp_matrix: Path, shape: Tuple[int, int]) -> None:
+        """Swap in a fully written matrix file together with its keys"""
+        tmp_keys = self._tmp_path('keys', '.npy')
+        np.save(tmp_keys, keys)
+
+        # Drop the keys first so a crash mid-swap never pairs old keys with new vectors
+        if self.keys_path.exists():
+            os.remove(self.keys_path)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_keys, self.keys_path)
+        with open(self.meta_path, 'w') as f:
+            json.dump({'model': self.model_name, 'count': int(shape[0]), 'dim': int(shape[1])}, f)
+
+    def _open_rows(self, raw_path: Path, stored: Optional[np.ndarray], n_stored: int):
+        """File for the new matrix's rows, starting with the first n_stored stored rows; in memory if unwritable"""
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            raw = open(raw_path, 'wb')
+        except OSError as e:
+            print(f"Could not persist embeddings: {str(e)}")
+            raw = io.BytesIO()
+        for block in range(0, n_stored, 65536):
+            raw.write(memoryview(np.ascontiguousarray(stored[block:min(block + 65536, n_stored)])))
+        return raw
+
+    def get_or_compute(
+        self,
+        texts: List[str],
+        encode: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """Return embeddings for texts, encoding only rows missing from the store"""
+        return self.get_or_compute_chunks([texts], encode)
+
+    def get_or_compute_chunks(
+        self,
+        text_chunks: Iterable[List[str]],
+        encode: Callable[[List[str]], np.ndarray],
+        batch_rows: int = 4096
+    ) -> np.ndarray:
+        """Embeddings for a stream of text chunks, encoding only rows missing from the store.
+
+        Each chunk's missing rows are encoded in batches of up to batch_rows as the
+        chunk arrives, and finished rows are streamed to disk, so memory holds one
+        chunk rather than the whole matrix. The result is memory-mapped.
+        """
+        stored_keys, stored = self.load()
+        sorted_keys = order = None
+        if stored is not None and len(stored_keys):
+            order = np.argsort(stored_keys)
+            sorted_keys = stored_keys[order]
+        dim = stored.shape[1] if stored is not None else None
+
+        keys: List[np.ndarray] = []
+        n_rows = n_encoded = 0
+        # While every row so far matches the stored matrix position for position nothing is
+        # written; the first difference starts the new file, beginning with those rows
+        raw = None
+        raw_path = self._tmp_path('embeddings', '.raw')
+
+        for texts in text_chunks:
+            chunk_keys = np.array([self.content_key(t) for t in texts], dtype=KEY_DTYPE)
+            keys.append(chunk_keys)
+            start, n_rows = n_rows, n_rows + len(chunk_keys)
+            if raw is None and stored is not None and np.array_equal(stored_keys[start:n_rows], chunk_keys):
+                continue
+
+            found = np.zeros(len(chunk_keys), dtype=bool)
+            positions = np.zeros(len(chunk_keys), dtype=np.intp)
+            if sorted_keys is not None:
+                idx = np.minimum(np.searchsorted(sorted_keys, chunk_keys), len(sorted_keys) - 1)
+                found = sorted_keys[idx] == chunk_keys
+                positions = order[idx]
+            missing = np.flatnonzero(~found)
+
+            encoded = []
+            for batch in range(0, len(missing), max(1, batch_rows)):
+                rows = missing[batch:batch + batch_rows]
+                encoded.append(np.asarray(encode([texts[i] for i in rows]), dtype=np.float32))
+            n_encoded += len(missing)
+            if dim is None and encoded:
+                dim = encoded[0].shape[1]
+            if dim is None:
+                continue  # nothing stored and an empty chunk
+
+            chunk = np.empty((len(chunk_keys), dim), dtype=np.float32)
+            if found.any():
+                chunk[found] = stored[positions[found]]
+            if encoded:
+                chunk[missing] = np.concatenate(encoded)
+
+            if raw is None:
+                raw = self._open_rows(raw_path, stored, start)
+            raw.write(memoryview(chunk))
+
+        self.encoded_count += n_encoded
+        print(f"Embedding store: {n_rows - n_encoded} cached, {n_encoded} to encode")
+
+        # Warm start: catalog unchanged, serve the memory-mapped matrix as is
+        if raw is None and stored is not None and n_rows == len(stored_keys):
+            return stored
+        if dim is None:
+            return np.empty((0, 0), dtype=np.float32)
+        if raw is None:
+            # A prefix of the stored rows: nothing was written yet
+            raw = self._open_rows(raw_path, stored, n_rows)
+        del stored
+        if isinstance(raw, io.BytesIO):
+            return np.frombuffer(raw.getbuffer(), dtype=np.float32).reshape(n_rows, dim).copy()
+        raw.close()
+
+        all_keys = np.concatenate(keys) if keys else np.empty(0, dtype=KEY_DTYPE)
+        tmp_matrix = self._tmp_path('embeddings', '.npy')
+        try:
+            with open(tmp_matrix, 'wb') as out, open(raw_path, 'rb') as src:
+                np.lib.format.write_array_header_1_0(out, {
+                    'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                    'fortran_order': False,
+                    'shape': (n_rows, dim),
+                })
+                shutil.copyfileobj(src, out, 1 << 24)
+            self._commit(all_keys, tmp_matrix, (n_rows, dim))
+        except OSError as e:
+            print(f"Could not persist embeddings: {str(e)}")
+            return np.fromfile(raw_path, dtype=np.float32).reshape(n_rows, dim)
+        finally:
+            raw_path.unlink(missing_ok=True)
+
+        # Re-open as a memory map so the matrix is backed by the shared page cache
+        _, mapped = self.load()
+        return mapped if mapped is not None else np.load(self.matrix_path)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple, Union
+
+# filter key -> DataFrame column
+FACET_COLUMNS = {
+    'skin_type': 'skin_type',
+    'concerns': 'skincare_concerns',
+    'brand': 'brand',
+    'formulation': 'formulation',
+}
+
+
+def _normalize(value) -> str:
+    return str(value).strip().lower()
+
+
+class FacetIndex:
+    """Packed per-value bitmaps and sorted numeric columns for vectorized catalog filtering"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self._keys: Dict[str, List[str]] = {}
+        self._pairs: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # facet -> (rows, value ids)
+        for facet, column in FACET_COLUMNS.items():
+            values = df[column] if column in df.columns else pd.Series([''] * self.n_rows)
+            self.bitmaps[facet] = self._build_bitmaps(facet, values)
+
+        self._sorted = {}
+        for column in ('price', 'rating'):
+            values = pd.to_numeric(df[column], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind='stable')
+            self._sorted[column] = (order, values[order])
+
+    def _build_bitmaps(self, facet: str, values: pd.Series) -> Dict[str, np.ndarray]:
+        """One packed bitmap per distinct normalized value; list cells set several.
+
+        Also records the (row, value) pairs, so counts are one bincount per facet
+        however many distinct values it has.
+        """
+        rows: Dict[str, List[int]] = {}
+        for row, cell in enumerate(values):
+            for value in (cell if isinstance(cell, list) else [cell]):
+                key = _normalize(value) if isinstance(value, str) else ''
+                if key:
+                    rows.setdefault(key, []).append(row)
+
+        bitmaps = {}
+        for key, key_rows in rows.items():
+            bits = np.zeros(self.n_rows, dtype=bool)
+            bits[key_rows] = True
+            bitmaps[key] = np.packbits(bits)
+
+        keys = list(rows)
+        self._keys[facet] = keys
+        self._pairs[facet] = (
+            np.fromiter((row for key in keys for row in rows[key]), dtype=np.int64),
+            np.repeat(np.arange(len(keys)), [len(rows[key]) for key in keys]),
+        )
+        return bitmaps
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        return np.unpackbits(packed, count=self.n_rows).view(bool)
+
+    def _values_bitmap(self, facet: str, values: Union[str, List[str]], substring: bool = False) -> np.ndarray:
+        """OR of the bitmaps of the requested values (any-of semantics for lists)"""
+        wanted = [_normalize(v) for v in (values if isinstance(values, list) else [values])]
+        bitmaps = self.bitmaps[facet]
+        if substring:
+            keys = [key for key in bitmaps if any(w in key for w in wanted)]
+        else:
+            keys = [w for w in wanted if w in bitmaps]
+
+        combined = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for key in keys:
+            combined |= bitmaps[key]
+        return combined
+
+    def _range_bitmap(self, column: str, low: float = -np.inf, high: float = np.inf) -> np.ndarray:
+        """Rows whose value lies in [low, high], via binary search on the sorted column"""
+        order, sorted_values = self._sorted[column]
+        start = np.searchsorted(sorted_values, low, side='left')
+        end = np.searchsorted(sorted_values, high, side='right')
+        bits = np.zeros(self.n_rows, dtype=bool)
+        bits[order[start:end]] = True
+        return self._pack(bits)
+
+    def mask(self, filters: Optional[Dict]) -> np.ndarray:
+        """Boolean row mask for the given filters, combined as AND across keys"""
+        packed = np.full((self.n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        for key, value in (filters or {}).items():
+            if key == 'price_range' and isinstance(value, list) and len(value) == 2:
+                packed &= self._range_bitmap('price', float(value[0]), float(value[1]))
+            elif key == 'rating_min' and value:
+                packed &= self._range_bitmap('rating', low=float(value))
+            elif key == 'brand' and value:
+                packed &= self._values_bitmap('brand', value, substring=True)
+            elif key in FACET_COLUMNS and value:
+                packed &= self._values_bitmap(key, value)
+        return self._unpack(packed)
+
+    def counts(self, mask: np.ndarray, limit: int = 20) -> Dict[str, Dict[str, int]]:
+        """Number of rows in mask per facet value, most frequent first"""
+        counts = {}
+        for facet, keys in self._keys.items():
+            rows, value_ids = self._pairs[facet]
+            facet_counts = np.bincount(value_ids[mask[rows]], minlength=len(keys))
+            present = np.flatnonzero(facet_counts)
+            # Stable, so ties keep first-seen order
+            top = present[np.argsort(-facet_counts[present], kind='stable')][:limit]
+            counts[facet] = {keys[i]: int(facet_counts[i]) for i in top}
+        return counts
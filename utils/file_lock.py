@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized across processes
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Union[str, Path], shared: bool = False) -> Iterator[None]:
+    """Hold a lock on path (created if missing) for the block, across processes.
+
+    Used around cache builds: concurrent workers wait for the first one and then
+    load what it wrote. Readers take it shared, so they only wait for builders.
+    If the lock file cannot be created the block runs unlocked.
+    """
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path, 'a')
+    except OSError as e:
+        print(f"Could not create lock file {path}: {str(e)}")
+        lock_file = None
+    try:
+        if lock_file is not None and fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        if lock_file is not None:
+            # Closing the file releases the lock
+            lock_file.close()
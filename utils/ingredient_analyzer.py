@@ -1,6 +1,9 @@
-from typing import List, Dict, Optional, Union  # Added Optional
+import hashlib
+import json
+from typing import Iterable, List, Dict, Optional, Set, Union  # Added Optional
 from models.pydantic_models import IngredientAnalysis
-import pandas as pd
+from utils.multi_pattern import MultiPatternMatcher
+import numpy as np
 
 class IngredientAnalyzer:
     def __init__(self):
@@ -22,11 +25,64 @@ class IngredientAnalyzer:
             'exfoliating': ['salicylic acid', 'glycolic acid', 'lactic acid'],
             'soothing': ['aloe vera', 'centella asiatica', 'chamomile', 'allantoin']
         }
+        self.compile_rules()
     
+    def compile_rules(self):
+        """Compile every rule term into one multi-pattern matcher; call again after editing the tables"""
+        terms = [i for ingredients in self.potentially_harmful.values() for i in ingredients]
+        terms += self.common_allergens
+        terms += [i for ingredients in self.beneficial_ingredients.values() for i in ingredients]
+        terms = list(dict.fromkeys(terms))
+        # Ingredients are matched within comma-separated entries, so terms cannot span them
+        if any(',' in term or term != term.strip() for term in terms):
+            raise ValueError("Ingredient rule terms must not contain commas or surrounding whitespace")
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self._matcher = MultiPatternMatcher(terms)
+
+    @staticmethod
+    def _split_ingredients(ingredients_str: Union[str, float]) -> Optional[List[str]]:
+        """Normalized ingredient entries, or None for empty or invalid input"""
+        if not isinstance(ingredients_str, str) or not ingredients_str.strip():
+            return None
+        return [i.strip().lower() for i in ingredients_str.split(',')]
+
+    def _analysis_fields(self, matched: Set[int]) -> Dict[str, List[str]]:
+        """Analysis fields from the ids of the rule terms found in the ingredients"""
+        # Find potentially harmful ingredients
+        harmful = []
+        for category, ingredients in self.potentially_harmful.items():
+            harmful.extend(i for i in ingredients if self._term_ids[i] in matched)
+        
+        # Find allergens
+        allergens = [a for a in self.common_allergens if self._term_ids[a] in matched]
+        
+        # Find beneficial ingredients
+        benefits = []
+        for benefit, ingredients in self.beneficial_ingredients.items():
+            found = [i for i in ingredients if self._term_ids[i] in matched]
+            if found:
+                benefits.append(f"{benefit.title()}: {', '.join(found)}")
+        
+        return {
+            'potentially_harmful': harmful,
+            'key_benefits': benefits,
+            'common_allergens': allergens
+        }
+
+    def rules_fingerprint(self) -> str:
+        """Hash of the rule tables, used to invalidate cached analyses"""
+        rules = json.dumps(
+            [self.potentially_harmful, self.common_allergens, self.beneficial_ingredients],
+            sort_keys=True
+        )
+        return hashlib.sha256(rules.encode('utf-8')).hexdigest()
+
     def analyze_ingredients(self, ingredients_str: Union[str, float]) -> Optional[IngredientAnalysis]:
         """Analyze ingredients string and return structured analysis"""
+        ingredients_list = self._split_ingredients(ingredients_str)
+        
         # Handle empty or invalid input
-        if pd.isna(ingredients_str) or not isinstance(ingredients_str, str) or not ingredients_str.strip():
+        if ingredients_list is None:
             return IngredientAnalysis(
                 ingredients_list=[],
                 potentially_harmful=[],
@@ -36,32 +92,8 @@ class IngredientAnalyzer:
             
         # Process valid ingredients string
         try:
-            ingredients_list = [i.strip().lower() for i in ingredients_str.split(',')]
-            
-            # Find potentially harmful ingredients
-            harmful = []
-            for category, ingredients in self.potentially_harmful.items():
-                found = [i for i in ingredients if any(i in ing.lower() for ing in ingredients_list)]
-                if found:
-                    harmful.extend(found)
-            
-            # Find allergens
-            allergens = [a for a in self.common_allergens 
-                        if any(a in ing.lower() for ing in ingredients_list)]
-            
-            # Find beneficial ingredients
-            benefits = []
-            for benefit, ingredients in self.beneficial_ingredients.items():
-                found = [i for i in ingredients if any(i in ing.lower() for ing in ingredients_list)]
-                if found:
-                    benefits.append(f"{benefit.title()}: {', '.join(found)}")
-            
-            return IngredientAnalysis(
-                ingredients_list=ingredients_list,
-                potentially_harmful=harmful,
-                key_benefits=benefits,
-                common_allergens=allergens
-            )
+            matched = self._matcher.match(','.join(ingredients_list))
+            return IngredientAnalysis(ingredients_list=ingredients_list, **self._analysis_fields(matched))
             
         except Exception as e:
             print(f"Error processing ingredients: {str(e)}")
@@ -70,4 +102,43 @@ class IngredientAnalyzer:
                 potentially_harmful=[],
                 key_benefits=[],
                 common_allergens=[]
-            )
\ No newline at end of file
+            )
+
+    def analyze_many(self, ingredients: Iterable[Union[str, float]]) -> List[IngredientAnalysis]:
+        """Analyze a whole column at once; same results as analyze_ingredients per value.
+
+        Runs in the calling process: catalog ingestion parallelizes across chunks instead.
+        """
+        values = list(ingredients)
+        if not values:
+            return []
+
+        lists = [self._split_ingredients(value) for value in values]
+        hits = self._matcher.match_many([','.join(l) if l else '' for l in lists])
+
+        # Rows with the same set of matched terms share the derived fields
+        unique_hits, inverse = np.unique(np.packbits(hits, axis=1), axis=0, return_inverse=True)
+        fields = [
+            self._analysis_fields(set(np.flatnonzero(np.unpackbits(row)[:hits.shape[1]]).tolist()))
+            for row in unique_hits
+        ]
+
+        results = []
+        for ingredients_list, group in zip(lists, inverse.reshape(-1)):
+            if ingredients_list is None:
+                results.append(IngredientAnalysis(
+                    ingredients_list=[],
+                    potentially_harmful=[],
+                    key_benefits=[],
+                    common_allergens=[]
+                ))
+                continue
+            # Values are already validated strings, so skip pydantic validation per row
+            row_fields = fields[group]
+            results.append(IngredientAnalysis.construct(
+                ingredients_list=ingredients_list,
+                potentially_harmful=list(row_fields['potentially_harmful']),
+                key_benefits=list(row_fields['key_benefits']),
+                common_allergens=list(row_fields['common_allergens'])
+            ))
+        return results
@@ -0,0 +1,109 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Set
+
+# Alternative names an exclusion should also cover
+INGREDIENT_SYNONYMS = {
+    'fragrance': ['parfum'],
+    'parfum': ['fragrance'],
+    'vitamin c': ['ascorbic acid', 'ascorbyl'],
+    'vitamin e': ['tocopherol', 'tocopheryl'],
+    'vitamin a': ['retinol', 'retinyl'],
+    'sls': ['sodium lauryl sulfate'],
+    'sles': ['sodium laureth sulfate'],
+}
+
+MAX_CACHED_TERMS = 4096
+
+
+class IngredientIndex:
+    """Inverted index from normalized ingredient names to the catalog rows containing them"""
+
+    def __init__(
+        self,
+        ingredient_lists: pd.Series,
+        families: Optional[Dict[str, List[str]]] = None,
+        synonyms: Optional[Dict[str, List[str]]] = None
+    ):
+        self.families = families or {}
+        self.synonyms = INGREDIENT_SYNONYMS if synonyms is None else synonyms
+        self.n_rows = len(ingredient_lists)
+        self._term_cache: Dict[str, np.ndarray] = {}
+
+        lengths = ingredient_lists.map(len).to_numpy()
+        rows = np.repeat(np.arange(self.n_rows), lengths)
+        names = np.array([name for names in ingredient_lists for name in names], dtype=object)
+        nonempty = names != ''
+        codes, vocabulary = pd.factorize(names[nonempty])
+        rows = rows[nonempty]
+
+        # Posting lists in CSR layout: rows of ingredient i are postings[offsets[i]:offsets[i + 1]]
+        order = np.argsort(codes, kind='stable')
+        self.postings = rows[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+        self.vocabulary = list(vocabulary)
+
+        # Per-row sorted, de-duplicated ingredient ids in CSR layout, for product-to-product overlap
+        n_names = max(1, len(self.vocabulary))
+        pairs = np.unique(rows.astype(np.int64) * n_names + codes)
+        self.row_ingredients = (pairs % n_names).astype(np.int32)
+        self.row_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(pairs // n_names, minlength=self.n_rows))]
+        )
+
+        # All names in one buffer so a term lookup is a single C-level substring scan
+        self._blob = '\n'.join(self.vocabulary)
+        self._starts = np.cumsum([0] + [len(name) + 1 for name in self.vocabulary[:-1]])
+
+    @classmethod
+    def from_analyses(cls, analyses: pd.Series, **kwargs) -> 'IngredientIndex':
+        """Build from a column of IngredientAnalysis objects"""
+        return cls(analyses.map(lambda a: a.ingredients_list if a is not None else []), **kwargs)
+
+    def ingredient_ids(self, row: int) -> np.ndarray:
+        """Sorted ids of the distinct ingredients of a catalog row"""
+        return self.row_ingredients[self.row_offsets[row]:self.row_offsets[row + 1]]
+
+    def expand(self, term: str) -> Set[str]:
+        """Term plus its synonyms and, for family names such as 'parabens', the family members"""
+        term = term.strip().lower()
+        if not term:
+            return set()
+        expanded = {term}
+        expanded.update(self.synonyms.get(term, []))
+        for family in (term, term + 's'):
+            expanded.update(self.families.get(family, []))
+        return expanded
+
+    def _vocabulary_ids(self, term: str) -> np.ndarray:
+        """Ids of every indexed ingredient name containing term"""
+        ids = self._term_cache.get(term)
+        if ids is None:
+            if len(self._term_cache) >= MAX_CACHED_TERMS:
+                self._term_cache.clear()
+            positions = [m.start() for m in re.finditer(re.escape(term), self._blob)]
+            ids = np.unique(np.searchsorted(self._starts, positions, side='right') - 1).astype(np.intp)
+            self._term_cache[term] = ids
+        return ids
+
+    def rows_containing(self, terms: Iterable[str]) -> np.ndarray:
+        """Boolean row mask of products containing any of the terms or their expansions"""
+        ids = [self._vocabulary_ids(name) for term in terms for name in self.expand(str(term))]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        if not ids:
+            return mask
+        ids = np.unique(np.concatenate(ids))
+
+        # Gather all matching posting ranges in one vectorized step
+        starts, lengths = self.offsets[ids], self.offsets[ids + 1] - self.offsets[ids]
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        mask[self.postings[positions]] = True
+        return mask
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'vocabulary_size': len(self.vocabulary),
+            'postings': len(self.postings),
+            'term_cache_size': len(self._term_cache),
+        }
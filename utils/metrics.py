@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; request stages range from microseconds (cached lookups) to seconds (cold encodes)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total, n) for labels, (counts, total, n) in self._series.items()}
+        for labels, (counts, total, n) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {n}')
+        return lines
+
+
+class Gauge:
+    """Last-set value per label combination"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics owned by this process plus collectors sampled at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labelnames, **kwargs))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, help, labelnames))
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, float]]):
+        """collect() returns {stat: number}; each becomes the gauge <prefix>_<stat>. Replaces any previous"""
+        self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for prefix, collect in self._collectors.items():
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"Error collecting {prefix} metrics: {str(e)}")
+                continue
+            for stat, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f'# TYPE {prefix}_{stat} gauge')
+                lines.append(f'{prefix}_{stat} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram('stage_seconds', 'Time spent in each request stage', ['stage'])
+REQUEST_SECONDS = REGISTRY.histogram('request_seconds', 'End-to-end request handling time', ['endpoint'])
+STARTUP_SECONDS = REGISTRY.gauge('startup_phase_seconds', 'Time spent in each startup phase', ['phase'])
+REBUILD_SECONDS = REGISTRY.gauge(
+    'catalog_rebuild_phase_seconds', 'Time spent in each phase of the latest catalog update', ['phase']
+)
+TTFT_SECONDS = REGISTRY.histogram(
+    'time_to_first_token_seconds', 'Time from a streamed request to its first generated token', ['generator']
+)
+GENERATION_SECONDS = REGISTRY.histogram(
+    'generation_seconds', 'Time from a streamed request to its last generated token', ['generator']
+)
+
+# Stage timings of the request being handled on this thread/task, if any
+_trace = ContextVar('request_trace', default=None)
+
+# Requests slower than this (seconds) are logged with their stage breakdown; 0 disables
+_slow_request = {'threshold': 0.0, 'path': ''}
+_slow_log_lock = threading.Lock()
+
+
+def configure_slow_request_log(threshold_ms: float, path: str = ''):
+    """Log requests slower than threshold_ms as JSON lines to path, or stdout if empty"""
+    _slow_request['threshold'] = threshold_ms / 1000.0
+    _slow_request['path'] = path
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as request stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+class RequestTrace:
+    """Timings of one request, whose work may span several threads (streamed responses).
+
+    stage() records into the trace on a thread where it is active(); add() records
+    a stage timed by hand. finish() records the total and logs the request if slow.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: List[Tuple[str, float]] = []
+        self.start = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        """Collect stage() timings of this thread into the trace for the block"""
+        token = _trace.set(self.stages)
+        try:
+            yield
+        finally:
+            _trace.reset(token)
+
+    def add(self, name: str, seconds: float):
+        STAGE_SECONDS.observe(seconds, name)
+        self.stages.append((name, seconds))
+
+    def finish(self):
+        """Record the request's total time; later calls do nothing"""
+        if self._finished:
+            return
+        self._finished = True
+        elapsed = time.perf_counter() - self.start
+        REQUEST_SECONDS.observe(elapsed, self.endpoint)
+        if _slow_request['threshold'] and elapsed >= _slow_request['threshold']:
+            _log_slow_request(self.endpoint, elapsed, self.stages)
+
+
+@contextmanager
+def trace_request(endpoint: str) -> Iterator[None]:
+    """Time a whole request and collect its stages for the slow-request log"""
+    trace = RequestTrace(endpoint)
+    try:
+        with trace.active():
+            yield
+    finally:
+        trace.finish()
+
+
+def _log_slow_request(endpoint: str, elapsed: float, trace: List[Tuple[str, float]]):
+    stages: Dict[str, float] = {}
+    for name, seconds in trace:
+        stages[name] = round(stages.get(name, 0.0) + seconds * 1000, 3)
+    line = json.dumps({
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'endpoint': endpoint,
+        'total_ms': round(elapsed * 1000, 3),
+        'stages_ms': stages,
+    })
+    if _slow_request['path']:
+        try:
+            with _slow_log_lock, open(_slow_request['path'], 'a') as f:
+                f.write(line + '\n')
+            return
+        except OSError as e:
+            print(f"Could not write slow request log: {str(e)}")
+    print(f"Slow request: {line}")
+
+
+@contextmanager
+def startup_phase(
+    name: str,
+    timings: Optional[Dict[str, float]] = None,
+    gauge: Optional[Gauge] = None
+) -> Iterator[None]:
+    """Time a startup phase into the startup gauge (or another one) and, if given, a timings dict"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        (gauge or STARTUP_SECONDS).set(elapsed, name)
+        if timings is not None:
+            timings[name] = elapsed
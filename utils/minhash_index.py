@@ -0,0 +1,97 @@
+import numpy as np
+from typing import Tuple
+
+# Mersenne prime for the universal hash family h(x) = (a * x + b) mod p
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHashIndex:
+    """MinHash signatures of per-row ingredient-id sets, banded into an LSH index.
+
+    Rows whose signatures agree on every value of at least one band become
+    candidates; candidates are then re-ranked by exact Jaccard overlap.
+    """
+
+    def __init__(
+        self,
+        row_ingredients: np.ndarray,
+        row_offsets: np.ndarray,
+        n_permutations: int = 48,
+        n_bands: int = 24,
+        chunk_rows: int = 65536,
+        seed: int = 0
+    ):
+        if n_permutations % n_bands:
+            raise ValueError("n_permutations must be a multiple of n_bands")
+        self.row_ingredients = row_ingredients
+        self.row_offsets = row_offsets
+        self.n_rows = len(row_offsets) - 1
+        self.n_bands = n_bands
+        self.band_width = n_permutations // n_bands
+        self.sizes = np.diff(row_offsets)
+
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, int(_PRIME), n_permutations, dtype=np.uint64)
+        b = rng.integers(0, int(_PRIME), n_permutations, dtype=np.uint64)
+        n_ids = int(row_ingredients.max()) + 1 if len(row_ingredients) else 0
+        ids = np.arange(n_ids, dtype=np.uint64)
+        # Hash of every ingredient id under every permutation: (n_ids, n_permutations)
+        id_hashes = ((ids[:, None] * a[None, :] + b[None, :]) % _PRIME).astype(np.uint32)
+
+        # Band keys: each band's slice of the signature folded into one uint64
+        mix = rng.integers(1, 1 << 63, self.band_width, dtype=np.uint64) | np.uint64(1)
+        self.band_keys = np.zeros((self.n_rows, n_bands), dtype=np.uint64)
+        for start in range(0, self.n_rows, chunk_rows):
+            stop = min(start + chunk_rows, self.n_rows)
+            signatures = self._signatures(id_hashes, start, stop)
+            bands = signatures.astype(np.uint64).reshape(stop - start, n_bands, self.band_width)
+            self.band_keys[start:stop] = (bands * mix).sum(axis=2)
+
+        # Per band, rows sorted by key: a bucket is a contiguous run found by binary search
+        self.band_order = np.argsort(self.band_keys, axis=0, kind='stable')
+        self.sorted_keys = np.take_along_axis(self.band_keys, self.band_order, axis=0)
+
+    def _signatures(self, id_hashes: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Minimum hash per permutation for rows [start, stop); empty rows get all-max"""
+        signatures = np.full((stop - start, id_hashes.shape[1]), np.iinfo(np.uint32).max, dtype=np.uint32)
+        offsets = self.row_offsets[start:stop + 1]
+        nonempty = np.flatnonzero(np.diff(offsets))
+        if len(nonempty):
+            hashes = id_hashes[self.row_ingredients[offsets[0]:offsets[-1]]]
+            signatures[nonempty] = np.minimum.reduceat(hashes, offsets[nonempty] - offsets[0], axis=0)
+        return signatures
+
+    def candidates(self, row: int, max_candidates: int = 5000) -> np.ndarray:
+        """Rows sharing at least one LSH bucket with row, excluding row itself"""
+        if self.sizes[row] == 0:
+            return np.empty(0, dtype=np.intp)
+        found = []
+        for band in range(self.n_bands):
+            key = self.band_keys[row, band]
+            keys = self.sorted_keys[:, band]
+            lo = np.searchsorted(keys, key, side='left')
+            hi = np.searchsorted(keys, key, side='right')
+            found.append(self.band_order[lo:min(hi, lo + max_candidates), band])
+        rows = np.unique(np.concatenate(found))
+        return rows[(rows != row) & (self.sizes[rows] > 0)][:max_candidates]
+
+    def jaccard(self, row: int, rows: np.ndarray) -> np.ndarray:
+        """Exact Jaccard overlap between row's ingredients and each of rows' (all non-empty)"""
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float64)
+        query = self.row_ingredients[self.row_offsets[row]:self.row_offsets[row + 1]]
+        starts, lengths = self.row_offsets[rows], self.sizes[rows]
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        shared = np.isin(self.row_ingredients[positions], query).astype(np.int64)
+        intersection = np.add.reduceat(shared, np.cumsum(lengths) - lengths)
+        union = len(query) + lengths - intersection
+        return np.divide(intersection, union, out=np.zeros(len(rows)), where=union > 0)
+
+    def similar(self, row: int, k: int, min_similarity: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, Jaccard scores) of the k most similar formulas to row, best first"""
+        rows = self.candidates(row)
+        scores = self.jaccard(row, rows)
+        keep = scores >= min_similarity
+        rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, -scores))[:k]
+        return rows[order], scores[order]
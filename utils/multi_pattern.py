@@ -0,0 +1,133 @@
+import re
+from collections import deque
+from typing import Dict, List, Sequence, Set
+import numpy as np
+
+# Unicode code points, for the vectorized character-class lookup
+_N_CODEPOINTS = 0x110000
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick automaton compiled to a dense DFA: one pass over a text finds every pattern"""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+
+        # Characters that occur in some pattern get their own class, everything else is class 0
+        self.char_class: Dict[str, int] = {}
+        for pattern in self.patterns:
+            for ch in pattern:
+                self.char_class.setdefault(ch, len(self.char_class) + 1)
+        self.n_classes = len(self.char_class) + 1
+
+        # Trie of the patterns
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[int] = [0]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                cls = self.char_class[ch]
+                if cls not in goto[state]:
+                    goto.append({})
+                    outputs.append(0)
+                    goto[state][cls] = len(goto) - 1
+                state = goto[state][cls]
+            outputs[state] |= 1 << pattern_id
+
+        # Failure links folded into a full transition table, in BFS order
+        n_states = len(goto)
+        delta = [0] * (n_states * self.n_classes)
+        fail = [0] * n_states
+        for cls, child in goto[0].items():
+            delta[cls] = child
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for cls in range(self.n_classes):
+                child = goto[state].get(cls)
+                if child is None:
+                    delta[state * self.n_classes + cls] = delta[fail[state] * self.n_classes + cls]
+                else:
+                    fail[child] = delta[fail[state] * self.n_classes + cls]
+                    delta[state * self.n_classes + cls] = child
+                    queue.append(child)
+
+        self._delta = delta
+        self._outputs = outputs
+        self._batch_tables = None
+
+        # Single-text path: a stepped Python DFA is slower than the C regex engine, so
+        # scan with a lookahead alternation that reports the longest pattern starting at
+        # each position; any other pattern found there is a substring of it.
+        # The leading character class lets the engine skip positions no pattern starts at.
+        by_length = sorted(self.patterns, key=len, reverse=True)
+        first_chars = ''.join(sorted({re.escape(p[0]) for p in self.patterns if p}))
+        self._regex = re.compile(
+            '(?=[' + first_chars + '])(?=(' + '|'.join(re.escape(p) for p in by_length) + '))'
+        ) if first_chars else None
+        self._contained = {
+            pattern: {i for i, other in enumerate(self.patterns) if other in pattern}
+            for pattern in self.patterns
+        }
+
+    def __getstate__(self):
+        # The NumPy tables are cheap to rebuild and large to pickle
+        state = self.__dict__.copy()
+        state['_batch_tables'] = None
+        return state
+
+    def match(self, text: str) -> Set[int]:
+        """Ids of the patterns occurring anywhere in text"""
+        matched: Set[int] = set()
+        if self._regex is None:
+            return matched
+        for found in set(self._regex.findall(text)):
+            matched |= self._contained[found]
+        return matched
+
+    def _tables(self):
+        """NumPy versions of the DFA, built on first batch use"""
+        if self._batch_tables is None:
+            n_words = max(1, (len(self.patterns) + 63) // 64)
+            out_bits = np.zeros((len(self._outputs), n_words), dtype=np.uint64)
+            for state, bits in enumerate(self._outputs):
+                for word in range(n_words):
+                    out_bits[state, word] = (bits >> (64 * word)) & 0xFFFFFFFFFFFFFFFF
+            class_table = np.zeros(_N_CODEPOINTS, dtype=np.int32)
+            for ch, cls in self.char_class.items():
+                class_table[ord(ch)] = cls
+            self._batch_tables = (np.array(self._delta, dtype=np.int32), out_bits, class_table)
+        return self._batch_tables
+
+    def match_many(self, texts: Sequence[str], chunk_size: int = 4096) -> np.ndarray:
+        """Boolean matrix (len(texts), len(patterns)) of pattern occurrences.
+
+        All texts advance through the DFA together, one character position per
+        NumPy step, so the Python-level loop is over text length, not catalog size.
+        """
+        delta, out_bits, class_table = self._tables()
+        n_words = out_bits.shape[1]
+        hits = np.zeros((len(texts), n_words), dtype=np.uint64)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        order = np.argsort(lengths, kind='stable')
+
+        # Similar lengths share a chunk, which keeps padding small
+        for start in range(0, len(texts), chunk_size):
+            rows = order[start:start + chunk_size]
+            width = int(lengths[rows].max()) if len(rows) else 0
+            if width == 0:
+                continue
+            padded = ''.join(texts[i].ljust(width, '\0') for i in rows)
+            codepoints = np.frombuffer(padded.encode('utf-32-le'), dtype=np.uint32)
+            classes = np.ascontiguousarray(class_table[codepoints].reshape(len(rows), width).T)
+
+            state = np.zeros(len(rows), dtype=np.int32)
+            chunk_hits = np.zeros((len(rows), n_words), dtype=np.uint64)
+            for position in range(width):
+                state = delta[state * self.n_classes + classes[position]]
+                chunk_hits |= out_bits[state]
+            hits[rows] = chunk_hits
+
+        bits = np.unpackbits(hits.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :len(self.patterns)].astype(bool)
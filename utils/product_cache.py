@@ -0,0 +1,88 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.pydantic_models import SephoraProduct
+from utils.text_column import TextColumn
+
+PRODUCT_FIELDS = list(SephoraProduct.__fields__)
+
+
+def _optional(values: np.ndarray, cast) -> list:
+    return [None if np.isnan(v) else cast(v) for v in values]
+
+
+class ProductCache:
+    """Pre-validated SephoraProduct fields per catalog row, plus memoized JSON fragments.
+
+    Descriptions can be passed as a TextColumn kept outside the frame; rows are decoded on access.
+    """
+
+    def __init__(self, df: pd.DataFrame, descriptions: Optional[TextColumn] = None, json_cache_size: int = 50000):
+        n_rows = len(df)
+        column = lambda name, default: df[name] if name in df.columns else pd.Series([default] * n_rows)
+
+        # Same conversions SephoraProduct construction applied per row, done once per column
+        self.columns: Dict[str, list] = {
+            'pid': df['pid'].astype(str).tolist(),
+            'name': df['name'].astype(str).tolist(),
+            'brand': df['brand'].astype(str).tolist(),
+            'price': pd.to_numeric(df['price'], errors='coerce').fillna(0.0).astype(float).tolist(),
+            'category': column('Category', '').astype(str).tolist(),
+            'description': descriptions if descriptions is not None else df['description'].astype(str).tolist(),
+            'rating': _optional(pd.to_numeric(df['rating'], errors='coerce').to_numpy(dtype=float), float),
+            'reviews': _optional(pd.to_numeric(df['reviews'], errors='coerce').to_numpy(dtype=float), int),
+            'ingredients': [str(v) if pd.notnull(v) else '' for v in df['ingredients']],
+            'skin_type': [v if isinstance(v, list) else [] for v in df['skin_type']],
+            'skincare_concerns': [v if isinstance(v, list) else [] for v in df['skincare_concerns']],
+            'formulation': column('formulation', '').astype(str).tolist(),
+            'ingredient_analysis': df['ingredient_analysis'].tolist(),
+        }
+        self.json_cache_size = json_cache_size
+        self._json: Dict[Tuple[Optional[Tuple[str, ...]], int], str] = {}  # (fields, row) -> JSON
+        self._json_hits = 0
+        self._json_misses = 0
+
+    def payload(self, row: int, fields: Optional[Sequence[str]] = None) -> Dict:
+        """Field values of one product, optionally restricted to fields"""
+        return {field: self.columns[field][row] for field in (fields or PRODUCT_FIELDS)}
+
+    def product(self, row: int) -> SephoraProduct:
+        """SephoraProduct for a row, skipping validation of already-converted values"""
+        return SephoraProduct.construct(**self.payload(row))
+
+    def products(self, rows: Sequence[int]) -> List[SephoraProduct]:
+        return [self.product(int(row)) for row in rows]
+
+    def _encode(self, row: int, fields: Optional[Sequence[str]]) -> str:
+        payload = self.payload(row, fields)
+        analysis = payload.get('ingredient_analysis')
+        if analysis is not None:
+            payload['ingredient_analysis'] = analysis.dict()
+        return json.dumps(payload, ensure_ascii=False)
+
+    def product_json(self, row: int, fields: Optional[Sequence[str]] = None) -> str:
+        """JSON object for a row, serialized once per projection and reused"""
+        key = (tuple(fields) if fields else None, row)
+        fragment = self._json.get(key)
+        if fragment is not None:
+            self._json_hits += 1
+        else:
+            self._json_misses += 1
+            if len(self._json) >= self.json_cache_size:
+                self._json.clear()
+            fragment = self._encode(row, fields or None)
+            self._json[key] = fragment
+        return fragment
+
+    def products_json(self, rows: Sequence[int], fields: Optional[Sequence[str]] = None) -> str:
+        """JSON array of products, concatenated from per-product fragments"""
+        return '[' + ','.join(self.product_json(int(row), fields) for row in rows) + ']'
+
+    def stats(self) -> Dict[str, int]:
+        """JSON fragment cache statistics (approximate under concurrency)"""
+        return {
+            'json_cache_size': len(self._json),
+            'json_cache_hits': self._json_hits,
+            'json_cache_misses': self._json_misses,
+        }
@@ -1,3 +1,5 @@
+import numpy as np
+from typing import Optional, Sequence
 from models.pydantic_models import ProductComparison, SephoraProduct
 from utils.ingredient_analyzer import IngredientAnalyzer
 
@@ -5,7 +7,25 @@ class ProductComparer:
     def __init__(self, ingredient_analyzer: IngredientAnalyzer):
         self.ingredient_analyzer = ingredient_analyzer
     
-    def compare_products(self, product1: SephoraProduct, product2: SephoraProduct) -> ProductComparison:
+    @staticmethod
+    def overlap_matrix(ingredient_ids: Sequence[np.ndarray]) -> np.ndarray:
+        """Pairwise Jaccard overlap of integer ingredient-id sets, in one matrix product"""
+        present = np.unique(np.concatenate(ingredient_ids)) if len(ingredient_ids) else np.empty(0)
+        incidence = np.zeros((len(ingredient_ids), len(present)), dtype=np.float32)
+        for i, ids in enumerate(ingredient_ids):
+            incidence[i, np.searchsorted(present, ids)] = 1.0
+        
+        intersection = incidence @ incidence.T
+        sizes = np.diag(intersection)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    def compare_products(
+        self,
+        product1: SephoraProduct,
+        product2: SephoraProduct,
+        ingredient_overlap: Optional[float] = None
+    ) -> ProductComparison:
         similarities = []
         differences = {product1.name: [], product2.name: []}
         
@@ -35,11 +55,13 @@ class ProductComparer:
             differences[product1.name].append(f"Formulation: {product1.formulation}")
             differences[product2.name].append(f"Formulation: {product2.formulation}")
         
-        # Compare ingredients
+        # Compare ingredients (callers holding an ingredient index pass the overlap in)
         if product1.ingredients and product2.ingredients:
-            ingredients1 = set(product1.ingredient_analysis.ingredients_list)
-            ingredients2 = set(product2.ingredient_analysis.ingredients_list)
-            ingredient_overlap = len(ingredients1 & ingredients2) / len(ingredients1 | ingredients2)
+            if ingredient_overlap is None:
+                ingredients1 = set(product1.ingredient_analysis.ingredients_list)
+                ingredients2 = set(product2.ingredient_analysis.ingredients_list)
+                union = ingredients1 | ingredients2
+                ingredient_overlap = len(ingredients1 & ingredients2) / len(union) if union else 0
             
             # Compare beneficial ingredients
             if product1.ingredient_analysis and product2.ingredient_analysis:
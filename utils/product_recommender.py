@@ -1,111 +1,210 @@
+import copy
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional
-from sentence_transformers import SentenceTransformer
-from bs4 import BeautifulSoup
-from models.pydantic_models import SephoraProduct, ProductComparison
+import json
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
+from models.pydantic_models import (
+    SephoraProduct, ProductComparison, ProductComparisonMatrix, RecommendationQuery
+)
 from utils.ingredient_analyzer import IngredientAnalyzer
 from utils.product_comparer import ProductComparer
+from utils.embedding_store import EmbeddingStore
+from utils.catalog_ingest import ingest_catalog
+from utils.catalog_preprocessor import preprocess_catalog, product_texts
+from utils.catalog_snapshot import BUILD_LOCK_NAME, CatalogSnapshot
+from utils.catalog_state import CatalogState
+from utils.ingredient_index import IngredientIndex
+from utils.facet_index import FacetIndex
+from utils.file_lock import file_lock
+from utils.metrics import REBUILD_SECONDS, stage, startup_phase
+from utils.minhash_index import MinHashIndex
+from utils.product_cache import ProductCache
+from utils.query_encoder import QueryEncoder
+from utils.text_column import TextColumn
+from utils.vector_index import VectorIndex
+from config import (
+    MODEL_CONFIG, SENTENCE_TRANSFORMER_MODEL, CACHE_DIR, INGEST_WORKERS, INGEST_CHUNK_ROWS, EMBED_BATCH_ROWS,
+    QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS, QUERY_CACHE_SIZE
+)
+
+# Held while the catalog snapshot and embedding store are read or rebuilt
+BUILD_LOCK_PATH = Path(CACHE_DIR) / BUILD_LOCK_NAME
+
+# Embedding model of a short-lived encoder process, see ProductRecommender._encode_products
+_process_model = None
+
+
+def _sentence_transformer():
+    # Imported here: sentence_transformers pulls in torch, which dominates import time
+    from sentence_transformers import SentenceTransformer
+    device = MODEL_CONFIG['device']
+    return SentenceTransformer(SENTENCE_TRANSFORMER_MODEL, device=None if device == 'auto' else device)
+
+
+def _init_encoder_process():
+    global _process_model
+    _process_model = _sentence_transformer()
+
+
+def _encode_in_process(texts: List[str]) -> np.ndarray:
+    return np.asarray(_process_model.encode(texts, show_progress_bar=True), dtype=np.float32)
+
 
 class ProductRecommender:
-    def __init__(self, data_path: str):
-        self.df = pd.read_csv(data_path)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, data_path: str, load_model: bool = True):
+        """Load the catalog and, unless load_model is False, the embedding model.
+
+        Without the model (serve.py's parent, which forks afterwards) rows that
+        need embedding are encoded by a separate spawned process, so torch and
+        CUDA are never initialized here; call load_model() before searching.
+        """
+        self.embedding_model = None
+        self.query_encoder: Optional[QueryEncoder] = None
+        self._encoder_pool: Optional[ProcessPoolExecutor] = None
+        self.startup_timings: Dict[str, float] = {}
+        if load_model:
+            with startup_phase('load_model', self.startup_timings):
+                self.load_model()
+        self.data_path = data_path
+        self.embedding_store = EmbeddingStore(CACHE_DIR, SENTENCE_TRANSFORMER_MODEL)
         self.ingredient_analyzer = IngredientAnalyzer()
         self.product_comparer = ProductComparer(self.ingredient_analyzer)
-        self.product_embeddings = None
-        self._preprocess_data()
-        self._compute_embeddings()
-    
-    def _preprocess_data(self):
-        """Preprocess the raw Sephora data"""
-        # Handle missing values
-        self.df['description'] = self.df['description'].fillna('')
-        self.df['ingredients'] = self.df['ingredients'].fillna('')
-        self.df['brand'] = self.df['brand'].fillna('')
-        self.df['name'] = self.df['name'].fillna('')
-        self.df['Category'] = self.df['Category'].fillna('')
-        
-        # Clean price - remove currency symbol and convert to float
-        if 'price' in self.df.columns:
-            self.df['price'] = self.df['price'].apply(lambda x: 
-                float(str(x).replace('$', '').replace(',', '')) if pd.notnull(x) else 0.0
-            )
-        
-        # Clean ratings
-        if 'rating' in self.df.columns:
-            self.df['rating'] = pd.to_numeric(self.df['rating'], errors='coerce').fillna(0.0)
-        if 'reviews' in self.df.columns:
-            self.df['reviews'] = pd.to_numeric(self.df['reviews'], errors='coerce').fillna(0)
-        
-        # Extract structured data from description
-        descriptions = self.df['description'].apply(self._extract_from_description)
-        
-        # Add extracted columns with proper handling
-        self.df['skin_type'] = descriptions.apply(lambda x: x.get('skin_type', []))
-        self.df['skincare_concerns'] = descriptions.apply(lambda x: x.get('skincare_concerns', []))
-        self.df['formulation'] = descriptions.apply(lambda x: x.get('formulation', ''))
-        
-        # Analyze ingredients
-        print("Analyzing ingredients...")
-        self.df['ingredient_analysis'] = self.df['ingredients'].apply(
-            self.ingredient_analyzer.analyze_ingredients
+        self.catalog_snapshot = CatalogSnapshot(CACHE_DIR, data_path, self.ingredient_analyzer)
+        # Catalog updates are applied one at a time, each building on the latest state
+        self._update_lock = threading.Lock()
+        try:
+            df, descriptions, embeddings = self._load_catalog(data_path)
+        finally:
+            if self._encoder_pool is not None:
+                self._encoder_pool.shutdown()
+                self._encoder_pool = None
+        self.state = CatalogState(
+            df, descriptions, embeddings, self.ingredient_analyzer, timings=self.startup_timings
+        )
+
+    def _load_catalog(self, data_path: str) -> Tuple[pd.DataFrame, TextColumn, np.ndarray]:
+        """The catalog and its embeddings from the snapshot, or ingested from the CSV on a cold cache"""
+        # Shared: waits out a build or reload in another process, never for other readers
+        with file_lock(BUILD_LOCK_PATH, shared=True), startup_phase('load_catalog', self.startup_timings):
+            snapshot = self.catalog_snapshot.load()
+        if snapshot is None:
+            # Processes starting together on a cold cache build it once; the rest wait, then load it
+            with file_lock(BUILD_LOCK_PATH):
+                with startup_phase('load_catalog', self.startup_timings):
+                    snapshot = self.catalog_snapshot.load()
+                if snapshot is None:
+                    # Preprocessing and encoding overlap, so they are timed together
+                    with startup_phase('ingest', self.startup_timings):
+                        df, descriptions, embeddings = self._ingest(data_path, self.catalog_snapshot)
+        if snapshot is not None:
+            print("Loaded catalog snapshot")
+            df, descriptions = snapshot
+            with startup_phase('embeddings', self.startup_timings):
+                embeddings = self._compute_embeddings(df, descriptions)
+        return df, descriptions, embeddings
+
+    # Current catalog version; callers making several calls per request should use pinned()
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.state.df
+
+    @property
+    def product_embeddings(self) -> np.ndarray:
+        return self.state.product_embeddings
+
+    @property
+    def product_cache(self) -> ProductCache:
+        return self.state.product_cache
+
+    @property
+    def ingredient_index(self) -> IngredientIndex:
+        return self.state.ingredient_index
+
+    @property
+    def facet_index(self) -> FacetIndex:
+        return self.state.facet_index
+
+    @property
+    def dupe_index(self) -> MinHashIndex:
+        return self.state.dupe_index
+
+    @property
+    def vector_index(self) -> VectorIndex:
+        return self.state.vector_index
+
+    @property
+    def catalog_version(self) -> int:
+        return self.state.version
+
+    def pinned(self) -> 'ProductRecommender':
+        """Read-only view fixed to the current catalog version, unaffected by later updates"""
+        return copy.copy(self)
+
+    def load_model(self):
+        """Load the sentence embedding model and the query encoder in front of it"""
+        self.embedding_model = _sentence_transformer()
+        self.query_encoder = QueryEncoder(
+            self.embedding_model,
+            max_batch_size=QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=QUERY_BATCH_MAX_WAIT_MS,
+            cache_size=QUERY_CACHE_SIZE
         )
-        print("Finished analyzing ingredients")
 
-    def _extract_from_description(self, description: str) -> Dict:
-        """Extract structured information from HTML description"""
-        if not isinstance(description, str):
-            return {'skin_type': [], 'skincare_concerns': [], 'formulation': ''}
-            
+    def _ingest(
+        self,
+        data_path: str,
+        snapshot: CatalogSnapshot,
+        reuse: Optional[CatalogState] = None,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Tuple[pd.DataFrame, TextColumn, np.ndarray]:
+        """Preprocess and embed a catalog CSV chunk by chunk, then save it as the snapshot.
+
+        Each chunk is encoded as soon as the process pool finishes it, while later
+        chunks are still being parsed; descriptions stream straight to the snapshot.
+        """
+        descriptions = snapshot.descriptions_writer()
+        frames: List[pd.DataFrame] = []
+
+        def chunk_texts() -> Iterator[List[str]]:
+            for chunk, texts in ingest_catalog(
+                data_path, self.ingredient_analyzer, descriptions,
+                n_jobs=INGEST_WORKERS, chunk_rows=INGEST_CHUNK_ROWS, reuse=reuse, stats=stats
+            ):
+                frames.append(chunk)
+                yield texts
+
         try:
-            soup = BeautifulSoup(description, 'html.parser')
-            text = soup.get_text()
-            
-            extracted = {
-                'skin_type': [],
-                'skincare_concerns': [],
-                'formulation': ''
-            }
-            
-            # Extract skin type
-            if 'Skin Type:' in text:
-                skin_type_text = text.split('Skin Type:')[1].split('<br>')[0].strip()
-                extracted['skin_type'] = [t.strip() for t in skin_type_text.split(',')]
-            
-            # Extract skincare concerns
-            if 'Skincare Concerns:' in text:
-                concerns_text = text.split('Skincare Concerns:')[1].split('<br>')[0].strip()
-                extracted['skincare_concerns'] = [c.strip() for c in concerns_text.split(',')]
-            
-            # Extract formulation
-            if 'Formulation:' in text:
-                formulation_text = text.split('Formulation:')[1].split('<br>')[0].strip()
-                extracted['formulation'] = formulation_text
-            
-            return extracted
-            
-        except Exception as e:
-            print(f"Error extracting from description: {str(e)}")
-            return {'skin_type': [], 'skincare_concerns': [], 'formulation': ''}
-
-    def _apply_filters(self, mask: np.ndarray, filters: Dict) -> np.ndarray:
+            embeddings = self.embedding_store.get_or_compute_chunks(
+                chunk_texts(), self._encode_products, batch_rows=EMBED_BATCH_ROWS
+            )
+        except BaseException:
+            descriptions.abort()
+            raise
+        df = pd.concat(frames, ignore_index=True)
+        del frames
+        mapped = descriptions.close()
+        snapshot.save(df, mapped)
+        return df, mapped, embeddings
+
+    def row_for_product(self, reference: str) -> int:
+        """Row of a product given by id or exact name; raises KeyError if unknown"""
+        return self.state.row_for_product(reference)
+
+    def _preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Preprocess the raw Sephora data"""
+        return preprocess_catalog(df, self.ingredient_analyzer)
+
+    def _apply_filters(self, mask: np.ndarray, filters: Dict, state: Optional[CatalogState] = None) -> np.ndarray:
         """Apply filters to the product selection"""
         if not filters:
             return mask
-            
-        for key, value in filters.items():
-            if key == 'price_range' and isinstance(value, list) and len(value) == 2:
-                mask &= (self.df['price'] >= float(value[0])) & (self.df['price'] <= float(value[1]))
-            elif key == 'skin_type' and value:
-                mask &= self.df['skin_type'].apply(lambda x: value in x if isinstance(x, list) else False)
-            elif key == 'concerns' and value:
-                mask &= self.df['skincare_concerns'].apply(lambda x: value in x if isinstance(x, list) else False)
-            elif key == 'brand' and value:
-                mask &= self.df['brand'].str.contains(str(value), case=False, na=False)
-            elif key == 'rating_min' and value:
-                mask &= self.df['rating'] >= float(value)
-        return mask
+
+        return mask & (state or self.state).facet_index.mask(filters)
 
     def find_similar_products(
         self,
@@ -115,62 +214,274 @@ class ProductRecommender:
         n_results: int = 3
     ) -> List[SephoraProduct]:
         """Find products based on query and filters"""
-        # Get query embedding
-        query_embedding = self.embedding_model.encode([query])
-        similarities = np.dot(self.product_embeddings, query_embedding.T).squeeze()
-        
+        recommender = self.pinned()
+        top_indices = recommender.find_similar_indices(query, filters, excluded_ingredients, n_results)
+        return recommender.product_cache.products(top_indices)
+
+    def find_similar_indices(
+        self,
+        query: str,
+        filters: Optional[Dict] = None,
+        excluded_ingredients: Optional[List[str]] = None,
+        n_results: int = 3
+    ) -> np.ndarray:
+        """Row indices of the best products for the query, best first"""
+        return self.rank(self.encode_query(query), filters, excluded_ingredients, n_results)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        with stage('encode_query'):
+            return self.query_encoder.encode(query)
+
+    def rank(
+        self,
+        query_embedding: np.ndarray,
+        filters: Optional[Dict] = None,
+        excluded_ingredients: Optional[List[str]] = None,
+        n_results: int = 3,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Row indices of the best products for an already encoded query, best first.
+
+        mask is candidate_mask(filters, excluded_ingredients) if the caller already built it.
+        """
+        state = self.state
+        if mask is None:
+            mask = self.candidate_mask(filters, excluded_ingredients, state)
+
+        # Get top results considering filters
+        with stage('vector_search'):
+            top_indices, _ = state.vector_index.search(
+                query_embedding, n_results, None if mask.all() else mask
+            )
+        return top_indices
+
+    def narrow(
+        self,
+        rows: np.ndarray,
+        filters: Optional[Dict] = None,
+        excluded_ingredients: Optional[List[str]] = None,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """The given rows, in their order, that pass the filters and exclusions (or a prebuilt mask)"""
+        if mask is None:
+            mask = self.candidate_mask(filters, excluded_ingredients)
+        return rows[mask[rows]]
+
+    def recommend_batch(
+        self,
+        queries: Sequence[RecommendationQuery],
+        chunk_size: int = 256,
+        max_scores: int = 32_000_000,
+        max_masks: int = 32
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (query position, row indices) for many queries, scored a chunk at a time.
+
+        Each chunk is encoded in one model batch and scored with one matrix product;
+        chunks are sized so the score matrix stays under max_scores entries. The
+        max_masks most recently used filter masks are kept for reuse.
+        """
+        state = self.state
+        n_products = max(1, len(state))
+        chunk_size = max(1, min(chunk_size, max_scores // n_products))
+        all_rows = np.arange(len(state))
+        masks: OrderedDict = OrderedDict()  # filter key -> mask, least recently used first
+
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            embeddings = self.query_encoder.encode_many([q.query for q in chunk])
+            scores = state.vector_index.score_all(embeddings)
+
+            for offset, q in enumerate(chunk):
+                row_scores = scores[offset]
+                # Offline jobs tend to repeat filter sets; build each mask once per batch
+                key = json.dumps([q.filters, q.excluded_ingredients], sort_keys=True)
+                mask = masks.get(key)
+                if mask is None:
+                    mask = masks[key] = self.candidate_mask(q.filters, q.excluded_ingredients, state)
+                    if len(masks) > max_masks:
+                        masks.popitem(last=False)
+                else:
+                    masks.move_to_end(key)
+                if not mask.all():
+                    row_scores[~mask] = -np.inf
+                rows, _ = state.vector_index.select(embeddings[offset], all_rows, row_scores, q.n_results)
+                yield start + offset, rows
+
+    def candidate_mask(
+        self,
+        filters: Optional[Dict] = None,
+        excluded_ingredients: Optional[List[str]] = None,
+        state: Optional[CatalogState] = None
+    ) -> np.ndarray:
+        """Boolean mask of products passing the filters and ingredient exclusions.
+
+        Callers that rank and count the same filters build it once and pass it to both.
+        """
+        state = state or self.state
         # Initialize mask
-        mask = np.ones(len(self.df), dtype=bool)
-        
+        mask = np.ones(len(state), dtype=bool)
+
         # Apply filters if provided
         if filters:
             try:
-                mask = self._apply_filters(mask, filters)
+                with stage('filters'):
+                    mask = self._apply_filters(mask, filters, state)
             except Exception as e:
                 print(f"Error applying filters: {str(e)}")
-        
+
         # Apply ingredient exclusions if provided
         if excluded_ingredients:
-            for ingredient in excluded_ingredients:
-                mask &= ~self.df['ingredients'].str.contains(str(ingredient), case=False, na=False)
-        
-        # Get top results considering filters
-        filtered_similarities = similarities.copy()
-        filtered_similarities[~mask] = -np.inf
-        top_indices = np.argsort(filtered_similarities)[-n_results:][::-1]
-        
-        # Convert to product models
-        return [self._create_product_model(self.df.iloc[i]) for i in top_indices]
-
-    def _create_product_model(self, row: pd.Series) -> SephoraProduct:
-        """Convert DataFrame row to Pydantic model with proper type handling"""
-        return SephoraProduct(
-            pid=str(row['pid']),  # Ensure pid is string
-            name=str(row['name']),
-            brand=str(row['brand']),
-            price=float(row['price']) if pd.notnull(row['price']) else 0.0,
-            category=str(row.get('Category', '')),
-            description=str(row['description']),
-            rating=float(row['rating']) if pd.notnull(row['rating']) else None,
-            reviews=int(row['reviews']) if pd.notnull(row['reviews']) else None,
-            ingredients=str(row['ingredients']) if pd.notnull(row['ingredients']) else '',
-            skin_type=row['skin_type'] if isinstance(row['skin_type'], list) else [],
-            skincare_concerns=row['skincare_concerns'] if isinstance(row['skincare_concerns'], list) else [],
-            formulation=str(row.get('formulation', '')),
-            ingredient_analysis=row['ingredient_analysis']
+            with stage('exclusions'):
+                mask &= ~state.ingredient_index.rows_containing(excluded_ingredients)
+        return mask
+
+    def facet_counts(
+        self,
+        filters: Optional[Dict] = None,
+        excluded_ingredients: Optional[List[str]] = None,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """Number of matching products, overall and per facet value (of a prebuilt mask, if given)"""
+        state = self.state
+        if mask is None:
+            mask = self.candidate_mask(filters, excluded_ingredients, state)
+        with stage('facet_counts'):
+            return int(mask.sum()), state.facet_index.counts(mask)
+
+    def compare_products(self, pid1: str, pid2: str) -> ProductComparison:
+        """Compare two products by id; raises KeyError for an unknown id"""
+        state = self.state
+        row1, row2 = state.rows_for_pids([pid1, pid2])
+        with stage('compare'):
+            overlap = self.product_comparer.overlap_matrix([
+                state.ingredient_index.ingredient_ids(row1),
+                state.ingredient_index.ingredient_ids(row2)
+            ])[0, 1]
+            return self.product_comparer.compare_products(
+                state.product_cache.product(row1),
+                state.product_cache.product(row2),
+                ingredient_overlap=float(overlap)
+            )
+
+    def compare_many(self, pids: Sequence[str]) -> ProductComparisonMatrix:
+        """Pairwise ingredient overlap, price and rating differences for a basket of products"""
+        state = self.state
+        rows = state.rows_for_pids(pids)
+        columns = state.product_cache.columns
+        overlap = self.product_comparer.overlap_matrix(
+            [state.ingredient_index.ingredient_ids(row) for row in rows]
+        )
+        prices = np.array([columns['price'][row] for row in rows], dtype=float)
+        ratings = np.array([columns['rating'][row] or 0.0 for row in rows], dtype=float)
+        return ProductComparisonMatrix(
+            pids=[columns['pid'][row] for row in rows],
+            names=[columns['name'][row] for row in rows],
+            ingredient_overlap=overlap.astype(float).round(4).tolist(),
+            price_difference=np.abs(prices[:, None] - prices[None, :]).tolist(),
+            rating_difference=np.abs(ratings[:, None] - ratings[None, :]).tolist()
+        )
+
+    def find_dupe_indices(
+        self,
+        reference: str,
+        n_results: int = 5,
+        min_similarity: float = 0.3
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, ingredient overlap) of the products with formulas closest to the given product"""
+        state = self.state
+        row = state.row_for_product(reference)
+        with stage('dupe_search'):
+            return state.dupe_index.similar(row, n_results, min_similarity)
+
+    def find_dupes(
+        self,
+        reference: str,
+        n_results: int = 5,
+        min_similarity: float = 0.3
+    ) -> List[Tuple[SephoraProduct, float]]:
+        """Products with similar formulas and their ingredient overlap, best first"""
+        recommender = self.pinned()
+        rows, scores = recommender.find_dupe_indices(reference, n_results, min_similarity)
+        return list(zip(recommender.product_cache.products(rows), scores.tolist()))
+
+    def _encode_products(self, texts: List[str]) -> np.ndarray:
+        if self.embedding_model is None:
+            # No model in this process (it forks later): encode in a spawned one
+            if self._encoder_pool is None:
+                self._encoder_pool = ProcessPoolExecutor(
+                    1, mp_context=multiprocessing.get_context('spawn'), initializer=_init_encoder_process
+                )
+            return self._encoder_pool.submit(_encode_in_process, texts).result()
+        return self.embedding_model.encode(texts, show_progress_bar=True)
+
+    def _compute_embeddings(self, df: pd.DataFrame, descriptions: TextColumn) -> np.ndarray:
+        """Compute embeddings for all products, reusing the on-disk store for unchanged rows"""
+        def chunk_texts() -> Iterator[List[str]]:
+            for start in range(0, len(df), INGEST_CHUNK_ROWS):
+                rows = range(start, min(start + INGEST_CHUNK_ROWS, len(df)))
+                yield product_texts(df.iloc[start:rows.stop], [descriptions[row] for row in rows])
+
+        return self.embedding_store.get_or_compute_chunks(
+            chunk_texts(), self._encode_products, batch_rows=EMBED_BATCH_ROWS
         )
 
-    def _compute_embeddings(self):
-        """Compute embeddings for all products"""
-        product_texts = self.df.apply(
-            lambda x: f"{x['name']} {x['brand']} {x['description']} " + 
-                     f"{' '.join(x['skin_type'] if isinstance(x['skin_type'], list) else [])} " +
-                     f"{' '.join(x['skincare_concerns'] if isinstance(x['skincare_concerns'], list) else [])}",
-            axis=1
-        ).tolist()
-        
-        self.product_embeddings = self.embedding_model.encode(
-            product_texts,
-            show_progress_bar=True
+    def _swap_state(self, df: pd.DataFrame, descriptions: TextColumn, embeddings: np.ndarray, **summary) -> Dict:
+        """Build the indexes for a new catalog version and make it current"""
+        state = CatalogState(
+            df, descriptions, embeddings, self.ingredient_analyzer, version=self.state.version + 1,
+            phase_gauge=REBUILD_SECONDS
         )
-        
\ No newline at end of file
+        # A single reference assignment: readers see either the old version or the new one
+        self.state = state
+        return {'version': state.version, 'products': len(state), **summary}
+
+    def upsert_products(self, products: List[Dict]) -> Dict:
+        """Insert or replace products given as raw catalog rows; only those rows are processed"""
+        with self._update_lock:
+            current = self.state
+            fresh = pd.DataFrame(products)
+            fresh = fresh[~fresh['pid'].astype(str).str.lower().duplicated(keep='last')]
+            fresh = self._preprocess_data(fresh.reset_index(drop=True))
+            encoded = np.asarray(self._encode_products(product_texts(fresh)), dtype=np.float32)
+            fresh_descriptions = TextColumn.from_strings(fresh.pop('description'))
+
+            # Replaced products leave their old position and are appended with the new ones
+            keys = set(fresh['pid'].astype(str).str.lower())
+            kept = ~current.df['pid'].astype(str).str.lower().isin(keys).to_numpy()
+            df = pd.concat([current.df[kept], fresh], ignore_index=True)
+            descriptions = TextColumn.concat([current.descriptions.take(np.flatnonzero(kept)), fresh_descriptions])
+            embeddings = np.concatenate([np.asarray(current.product_embeddings[kept]), encoded])
+            replaced = int((~kept).sum())
+            return self._swap_state(
+                df, descriptions, embeddings,
+                inserted=len(fresh) - replaced, updated=replaced,
+                reprocessed=len(fresh), embedded=len(fresh)
+            )
+
+    def delete_products(self, pids: Sequence[str]) -> Dict:
+        """Remove products by id; unknown ids are ignored"""
+        with self._update_lock:
+            current = self.state
+            keys = {str(pid).strip().lower() for pid in pids}
+            kept = ~current.df['pid'].astype(str).str.lower().isin(keys).to_numpy()
+            df = current.df[kept].reset_index(drop=True)
+            descriptions = current.descriptions.take(np.flatnonzero(kept))
+            embeddings = np.asarray(current.product_embeddings[kept])
+            return self._swap_state(df, descriptions, embeddings, deleted=int((~kept).sum()), reprocessed=0, embedded=0)
+
+    def reload(self) -> Dict:
+        """Re-read the catalog CSV, reprocessing and re-embedding only rows that changed"""
+        with self._update_lock:
+            data_path = self.data_path
+            current = self.state
+            # Rows whose raw values are unchanged keep their preprocessed form
+            stats: Dict[str, int] = {}
+            encoded_before = self.embedding_store.encoded_count
+            snapshot = CatalogSnapshot(CACHE_DIR, data_path, self.ingredient_analyzer)
+            with file_lock(BUILD_LOCK_PATH):
+                df, descriptions, embeddings = self._ingest(data_path, snapshot, reuse=current, stats=stats)
+            self.catalog_snapshot = snapshot
+            return self._swap_state(
+                df, descriptions, embeddings,
+                reprocessed=stats['reprocessed'], embedded=self.embedding_store.encoded_count - encoded_before
+            )
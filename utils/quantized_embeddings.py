@@ -0,0 +1,60 @@
+import numpy as np
+from typing import Optional
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+class QuantizedEmbeddings:
+    """Compact copy of an embedding matrix (float16, or int8 with per-row scales) for approximate scoring"""
+
+    def __init__(self, embeddings: np.ndarray, precision: str = 'float16', chunk_rows: int = 1024):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding precision: {precision}")
+        self.precision = precision
+        self.chunk_rows = chunk_rows
+        self.scales: Optional[np.ndarray] = None
+        n_rows, dim = embeddings.shape
+
+        if precision == 'int8':
+            self.codes = np.empty((n_rows, dim), dtype=np.int8)
+            self.scales = np.empty(n_rows, dtype=np.float32)
+        else:
+            self.codes = np.empty((n_rows, dim), dtype=np.dtype(precision))
+
+        # Convert in chunks so a memory-mapped source is never fully loaded at once
+        for start in range(0, n_rows, 65536):
+            block = np.asarray(embeddings[start:start + 65536], dtype=np.float32)
+            if precision == 'int8':
+                scales = np.abs(block).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                self.codes[start:start + len(block)] = np.round(block / scales[:, None]).astype(np.int8)
+                self.scales[start:start + len(block)] = scales
+            else:
+                self.codes[start:start + len(block)] = block
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate inner products of queries (dim,) or (n, dim) with the given rows (default all)"""
+        queries = np.asarray(queries, dtype=np.float32)
+        n_rows = len(self) if rows is None else len(rows)
+        out = np.empty(queries.shape[:-1] + (n_rows,), dtype=np.float32)
+
+        # Upcast one cache-sized chunk at a time into a reused buffer: the full
+        # matrix is only ever read in its compact form
+        buffer = np.empty((min(self.chunk_rows, n_rows), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, n_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_rows)
+            selected = slice(start, stop) if rows is None else rows[start:stop]
+            block = buffer[:stop - start]
+            np.copyto(block, self.codes[selected], casting='unsafe')
+            chunk_scores = queries @ block.T
+            if self.scales is not None:
+                chunk_scores *= self.scales[selected]
+            out[..., start:stop] = chunk_scores
+        return out
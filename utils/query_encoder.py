@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+class QueryEncoder:
+    """Micro-batching front end to the embedding model with an LRU cache of query embeddings"""
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 10000,
+        lowercase_keys: Optional[bool] = None
+    ):
+        self.model = model
+        # Queries differing only in case share a cache entry only if the model ignores case;
+        # by default that is read from the model's tokenizer
+        self.lowercase_keys = self.model_is_uncased(model) if lowercase_keys is None else lowercase_keys
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._queue: Queue = Queue()
+        self._worker = None
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+        self._batched_queries = 0
+        self._largest_batch = 0
+
+    @staticmethod
+    def model_is_uncased(model) -> bool:
+        """Whether the model's tokenizer lower-cases its input, so case never changes an embedding"""
+        return bool(getattr(getattr(model, 'tokenizer', None), 'do_lower_case', False))
+
+    def normalize(self, query: str) -> str:
+        """Cache key: collapsed whitespace, lower-cased for uncased models. The model sees the query as written"""
+        key = ' '.join(str(query).split())
+        return key.lower() if self.lowercase_keys else key
+
+    def _cache_get(self, key: str):
+        embedding = self._cache.get(key)
+        if embedding is not None:
+            self._cache.move_to_end(key)
+        return embedding
+
+    def _cache_put(self, key: str, embedding: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        embedding.flags.writeable = False
+        self._cache[key] = embedding
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def encode(self, query: str) -> np.ndarray:
+        """Embedding for one query, batched with concurrent callers"""
+        key = self.normalize(query)
+        with self._lock:
+            embedding = self._cache_get(key)
+            if embedding is not None:
+                self._hits += 1
+                return embedding
+            self._misses += 1
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                self._queue.put((key, query))
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='query-encoder', daemon=True)
+                    self._worker.start()
+        return future.result()
+
+    def encode_many(self, queries: Sequence[str]) -> np.ndarray:
+        """Embeddings for many queries: cache hits plus one model batch for the rest"""
+        keys = [self.normalize(q) for q in queries]
+        embeddings: List = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                embeddings[i] = self._cache_get(key)
+            hits = sum(e is not None for e in embeddings)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+        # First spelling of each missing key is the one encoded
+        missing: Dict[str, str] = {}
+        for key, query, embedding in zip(keys, queries, embeddings):
+            if embedding is None:
+                missing.setdefault(key, query)
+        if missing:
+            encoded = dict(zip(missing, self._encode_batch(list(missing.values()))))
+            with self._lock:
+                for key, embedding in encoded.items():
+                    self._cache_put(key, embedding)
+            embeddings = [e if e is not None else encoded[k] for k, e in zip(keys, embeddings)]
+        return np.vstack(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = np.asarray(self.model.encode(texts, batch_size=len(texts)), dtype=np.float32)
+        with self._lock:
+            self._batches += 1
+            self._batched_queries += len(texts)
+            self._largest_batch = max(self._largest_batch, len(texts))
+        return encoded
+
+    def _run(self):
+        """Worker: wait for a query, gather more for up to max_wait, encode them together"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            try:
+                encoded = self._encode_batch([query for _, query in batch])
+            except Exception as e:
+                with self._lock:
+                    futures = [self._pending.pop(key) for key, _ in batch]
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                futures = []
+                for (key, _), embedding in zip(batch, encoded):
+                    self._cache_put(key, embedding)
+                    futures.append((self._pending.pop(key), embedding))
+            for future, embedding in futures:
+                future.set_result(embedding)
+
+    def stats(self) -> Dict[str, float]:
+        """Cache hit rate and batch-size statistics"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'cache_hits': self._hits,
+                'cache_misses': self._misses,
+                'cache_hit_rate': self._hits / lookups if lookups else 0.0,
+                'cache_size': len(self._cache),
+                'batches': self._batches,
+                'mean_batch_size': self._batched_queries / self._batches if self._batches else 0.0,
+                'max_batch_size': self._largest_batch,
+            }
@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
+
+class Overloaded(Exception):
+    """Raised when the executor's in-flight and queued capacity is exhausted"""
+
+
+def _noop():
+    pass
+
+
+class RequestExecutor:
+    """Runs blocking request handling off the event loop with bounded concurrency and queue depth"""
+
+    def __init__(
+        self,
+        mode: str = 'thread',
+        max_workers: int = 4,
+        max_queue: int = 64,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = ()
+    ):
+        if mode not in ('inline', 'thread', 'process'):
+            raise ValueError(f"Unknown execution mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool: Optional[Executor] = None
+        if mode == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='chat')
+        elif mode == 'process':
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=initializer, initargs=initargs
+            )
+        # Created lazily so it binds to the server's event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._queued = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def acquire(self):
+        """Take a worker slot, or raise Overloaded if too many requests are waiting; release() returns it.
+
+        For requests whose work outlives one call, such as streamed responses.
+        """
+        if self._pool is None:
+            return
+
+        if self._in_flight + self._queued >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise Overloaded()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        self._in_flight += 1
+
+    def release(self):
+        """Return a slot taken by acquire(); call on the event loop"""
+        if self._pool is None:
+            return
+        self._in_flight -= 1
+        self._completed += 1
+        self._semaphore.release()
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool, or raise Overloaded if too many requests are waiting"""
+        if self._pool is None:
+            return fn(*args)
+
+        await self.acquire()
+        try:
+            return await self.run_reserved(fn, *args)
+        finally:
+            self.release()
+
+    async def run_reserved(self, fn: Callable, *args):
+        """Run fn(*args) on the pool under a slot the caller already holds"""
+        if self._pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    def warm_up(self):
+        """Start every pool process now, so their initializers run before the first request"""
+        if self.mode == 'process':
+            wait([self._pool.submit(_noop) for _ in range(self.max_workers)])
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'queued': self._queued,
+            'completed': self._completed,
+            'rejected': self._rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
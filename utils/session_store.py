@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class Session:
+    """One conversation's latest search: what was asked, the ranked candidates and how far they were shown"""
+
+    def __init__(
+        self,
+        conversation_id: str,
+        version: int,
+        query_embedding: np.ndarray,
+        filters: Dict,
+        excluded_ingredients: List[str],
+        rows: np.ndarray,
+        complete: bool,
+        total_results: int,
+        facets: Dict[str, Dict[str, int]],
+        ranking: int = 1,
+        page_start: int = 0,
+        offset: int = 0
+    ):
+        self.conversation_id = conversation_id
+        self.version = version  # catalog version the rows refer to
+        self.query_embedding = query_embedding
+        self.filters = filters
+        self.excluded_ingredients = excluded_ingredients
+        self.rows = rows
+        self.complete = complete  # rows hold every candidate, not just the best ones
+        self.total_results = total_results
+        self.facets = facets
+        self.ranking = ranking  # bumped whenever rows change meaning; part of the cursor
+        self.page_start = page_start
+        self.offset = offset
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.query_embedding.nbytes
+
+    def cursor(self) -> Optional[str]:
+        """Opaque cursor for the next page, or None if there is nothing left"""
+        if self.complete and self.offset >= len(self.rows):
+            return None
+        return f'{self.ranking}:{self.offset}'
+
+    def parse_cursor(self, cursor: str) -> Optional[int]:
+        """Offset a cursor points at, or None if it is malformed or from an earlier ranking"""
+        ranking, _, offset = cursor.partition(':')
+        if ranking != str(self.ranking) or not offset.isdigit():
+            return None
+        return int(offset)
+
+
+class SessionStore:
+    """LRU store of chat sessions with idle expiry; the oldest sessions are evicted beyond max_sessions"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl_seconds
+        self._sessions: OrderedDict = OrderedDict()  # id -> (last access, Session)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _expire(self, now: float):
+        """Drop sessions idle longer than the TTL; they sit at the front in access order"""
+        while self._sessions:
+            conversation_id, (accessed, _) = next(iter(self._sessions.items()))
+            if now - accessed <= self.ttl:
+                break
+            del self._sessions[conversation_id]
+            self._expirations += 1
+
+    @property
+    def enabled(self) -> bool:
+        """False for a store that keeps nothing (max_sessions <= 0)"""
+        return self.max_sessions > 0
+
+    def get(self, conversation_id: str) -> Optional[Session]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(conversation_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._sessions[conversation_id] = (now, entry[1])
+            self._sessions.move_to_end(conversation_id)
+            return entry[1]
+
+    def put(self, session: Session):
+        """Store or replace a conversation's session"""
+        if self.max_sessions <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session.conversation_id] = (now, session)
+            self._sessions.move_to_end(session.conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': sum(session.nbytes for _, session in self._sessions.values()),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
@@ -0,0 +1,121 @@
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+
+
+def _encode(value) -> bytes:
+    return (value if isinstance(value, str) else '').encode('utf-8')
+
+
+class TextColumn:
+    """Read-only strings stored as one UTF-8 blob plus row offsets, optionally memory-mapped from disk.
+
+    Keeps bulky text (HTML descriptions) out of the DataFrame: no per-row Python
+    objects, and when loaded from disk the bytes live in the shared page cache.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, path: Optional[str] = None):
+        self.data = data
+        self.offsets = offsets
+        self.path = path  # file prefix when memory-mapped, else None
+
+    @classmethod
+    def from_bytes(cls, values: List[bytes]) -> 'TextColumn':
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in values], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(values), dtype=np.uint8), offsets)
+
+    @classmethod
+    def from_strings(cls, values: Iterable) -> 'TextColumn':
+        """Non-string values (missing descriptions) are stored as empty strings"""
+        return cls.from_bytes([_encode(v) for v in values])
+
+    @classmethod
+    def concat(cls, columns: Sequence['TextColumn']) -> 'TextColumn':
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for column in columns:
+            offsets.append(column.offsets[1:] + base)
+            base += int(column.offsets[-1])
+        return cls(np.concatenate([c.data[:c.offsets[-1]] for c in columns] or [np.empty(0, np.uint8)]),
+                   np.concatenate(offsets))
+
+    @staticmethod
+    def _files(prefix: str):
+        return Path(f'{prefix}.txt'), Path(f'{prefix}.offsets.npy')
+
+    @classmethod
+    def load(cls, prefix: str) -> 'TextColumn':
+        """Memory-map a column written by save() or TextColumnWriter"""
+        data_file, offsets_file = cls._files(prefix)
+        offsets = np.load(offsets_file)
+        data = (np.memmap(data_file, dtype=np.uint8, mode='r') if offsets[-1]
+                else np.empty(0, dtype=np.uint8))
+        if len(data) < offsets[-1]:
+            raise ValueError(f"Truncated text column {data_file}")
+        return cls(data, offsets, prefix)
+
+    def save(self, prefix: str):
+        if self.path == prefix:
+            return
+        writer = TextColumnWriter(prefix)
+        writer.append_bytes(self.data[:self.offsets[-1]], self.offsets)
+        writer.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        """Every row decoded, in order"""
+        blob = bytes(self.data[:self.offsets[-1]])
+        bounds = self.offsets.tolist()
+        return [blob[start:stop].decode('utf-8') for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def take(self, rows: Sequence[int]) -> 'TextColumn':
+        """New in-memory column with the given rows, in order"""
+        data, offsets = self.data, self.offsets
+        return TextColumn.from_bytes([bytes(data[offsets[r]:offsets[r + 1]]) for r in rows])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets[-1]) + self.offsets.nbytes
+
+
+class TextColumnWriter:
+    """Append strings to an on-disk TextColumn chunk by chunk; close() makes it visible and maps it"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.data_file, self.offsets_file = TextColumn._files(prefix)
+        self.data_file.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_data = self.data_file.with_name(self.data_file.name + '.tmp')
+        self._file = open(self._tmp_data, 'wb')
+        self._lengths: List[np.ndarray] = []
+
+    def extend(self, values: Iterable):
+        encoded = [_encode(v) for v in values]
+        self._file.write(b''.join(encoded))
+        self._lengths.append(np.array([len(b) for b in encoded], dtype=np.int64))
+
+    def append_bytes(self, data: np.ndarray, offsets: np.ndarray):
+        self._file.write(memoryview(np.ascontiguousarray(data)))
+        self._lengths.append(np.diff(offsets))
+
+    def close(self) -> TextColumn:
+        self._file.close()
+        lengths = np.concatenate(self._lengths) if self._lengths else np.empty(0, dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        tmp_offsets = self.offsets_file.with_name('tmp-' + self.offsets_file.name)
+        np.save(tmp_offsets, offsets)
+        os.replace(self._tmp_data, self.data_file)
+        os.replace(tmp_offsets, self.offsets_file)
+        return TextColumn.load(self.prefix)
+
+    def abort(self):
+        self._file.close()
+        self._tmp_data.unlink(missing_ok=True)
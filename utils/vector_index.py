@@ -0,0 +1,194 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import List, Optional, Tuple
+from utils.quantized_embeddings import QuantizedEmbeddings
+
+# Below this many rows 'ivf' builds a brute-force index: an exact scan is as fast and needs no training
+IVF_MIN_ROWS = 1024
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest finite scores, best first"""
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class VectorIndex(ABC):
+    """Inner-product search over the product embedding matrix.
+
+    With a quantized copy, candidates are scored on the compact matrix and a
+    shortlist of k * rescore_factor rows is rescored against the full-precision one.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        quantized: Optional[QuantizedEmbeddings] = None,
+        rescore_factor: int = 4
+    ):
+        self.embeddings = embeddings
+        self.quantized = quantized
+        self.rescore_factor = max(1, rescore_factor)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @abstractmethod
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, scores) of the k best rows allowed by mask"""
+
+    def score_all(self, queries: np.ndarray) -> np.ndarray:
+        """Scores of one query (dim,) or many (n, dim) against every row; approximate if quantized"""
+        if self.quantized is not None:
+            return self.quantized.scores(queries)
+        return np.asarray(queries @ self.embeddings.T, dtype=np.float32)
+
+    def select(
+        self,
+        query: np.ndarray,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k of rows given their scores (-inf excludes a row), rescoring quantized shortlists"""
+        if self.quantized is not None:
+            shortlist = top_k_indices(scores, k * self.rescore_factor)
+            rows = np.sort(rows[shortlist])
+            scores = np.asarray(self.embeddings[rows] @ query, dtype=np.float32)
+        top = top_k_indices(scores, k)
+        return rows[top], scores[top]
+
+    def _search_rows(self, query: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search restricted to the given row ids"""
+        if self.quantized is not None:
+            scores = self.quantized.scores(query, rows)
+        else:
+            scores = np.asarray(self.embeddings[rows] @ query, dtype=np.float32)
+        return self.select(query, rows, scores, k)
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact search: scores every allowed row"""
+
+    def search(self, query, k, mask=None):
+        if mask is not None and mask.sum() < len(self) // 4:
+            return self._search_rows(query, np.flatnonzero(mask), k)
+
+        scores = self.score_all(query)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        return self.select(query, np.arange(len(self)), scores, k)
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: k-means partitions, searching only the n_probe closest lists"""
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        train_iters: int = 10,
+        train_sample: int = 100_000,
+        seed: int = 0,
+        **kwargs
+    ):
+        super().__init__(embeddings, **kwargs)
+        n_rows = embeddings.shape[0]
+        if n_rows == 0:
+            raise ValueError("An IVF index needs at least one row")
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(n_rows)), n_rows))
+        self.n_probe = n_probe
+        rng = np.random.default_rng(seed)
+
+        # Train centroids on a sample, then assign every row in chunks
+        sample_size = min(n_rows, max(train_sample, self.n_lists))
+        sample = np.asarray(embeddings[np.sort(rng.choice(n_rows, sample_size, replace=False))],
+                            dtype=np.float32)
+        self.centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(train_iters):
+            assignment = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            nonempty = counts > 0
+            self.centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+        assignment = np.concatenate([
+            self._assign(np.asarray(embeddings[start:start + 65536], dtype=np.float32))
+            for start in range(0, n_rows, 65536)
+        ]) if n_rows else np.empty(0, dtype=np.intp)
+        self.list_rows = np.argsort(assignment, kind='stable').astype(np.intp)
+        self.list_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))]
+        )
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid (L2) for each vector"""
+        distances = (
+            -2 * vectors @ self.centroids.T
+            + np.einsum('ij,ij->i', self.centroids, self.centroids)[None, :]
+        )
+        return np.argmin(distances, axis=1)
+
+    def search(self, query, k, mask=None, n_probe: Optional[int] = None):
+        n_probe = n_probe or self.n_probe
+        if mask is not None:
+            allowed = int(mask.sum())
+            # Highly selective filters: the allowed set is smaller than what we would probe
+            if allowed <= n_probe * len(self) / self.n_lists:
+                return self._search_rows(query, np.flatnonzero(mask), k)
+
+        probe_order = np.argsort(-(self.centroids @ query))
+        candidates: List[np.ndarray] = []
+        found = 0
+        for probed, list_id in enumerate(probe_order):
+            # Keep probing past n_probe until the filter leaves at least k candidates
+            if probed >= n_probe and found >= k:
+                break
+            rows = self.list_rows[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+            if mask is not None:
+                rows = rows[mask[rows]]
+            candidates.append(rows)
+            found += len(rows)
+
+        rows = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.intp)
+        return self._search_rows(query, rows, k)
+
+
+def create_vector_index(embeddings: np.ndarray, kind: str = 'exact', **kwargs) -> VectorIndex:
+    """Build the vector index named by kind ('exact' or 'ivf'; brute force below IVF_MIN_ROWS rows)"""
+    if kind == 'exact':
+        return BruteForceIndex(embeddings, **kwargs)
+    if kind == 'ivf':
+        if embeddings.shape[0] < IVF_MIN_ROWS:
+            kwargs = {key: value for key, value in kwargs.items() if key not in ('n_lists', 'n_probe')}
+            return BruteForceIndex(embeddings, **kwargs)
+        return IVFIndex(embeddings, **kwargs)
+    raise ValueError(f"Unknown vector index: {kind}")
+
+
+def recall_at_k(
+    index: VectorIndex,
+    reference: VectorIndex,
+    queries: np.ndarray,
+    k: int,
+    masks: Optional[List[np.ndarray]] = None
+) -> float:
+    """Fraction of the reference index's top-k that index also returns"""
+    hits, total = 0, 0
+    for i, query in enumerate(queries):
+        mask = masks[i] if masks is not None else None
+        expected, _ = reference.search(query, k, mask)
+        got, _ = index.search(query, k, mask)
+        hits += len(np.intersect1d(expected, got))
+        total += len(expected)
+    return hits / total if total else 1.0